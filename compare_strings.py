@@ -1,60 +1,409 @@
 """ The program compares two strings and prints 'OK' if they are equal and 'KO' otherwise 
     
     the * character in the second line means any combination of any characters
+
+    To filter a file by the pattern enter 'compare_strings.py --filter pattern file_name' in console,
+    --filter must be the first argument. Lines are read from stdin if file_name is missing or '-'.
+    Lines matching the pattern are printed,
+    add '--verdicts' to print 'OK' or 'KO' for every line instead.
+
+    Add '--workers N' to match the lines in N processes, the output is the same.
+
+    Other modules can use compile(pattern).match(string), compiled patterns are cached,
+    and PatternSet to find all patterns matching a string.
 """
 
+import argparse
+import functools
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+WILDCARD = '*'
+
+# number of compiled patterns kept by compile()
+COMPILE_CACHE_SIZE = 1024
+
+CHUNK_SIZE = 1 << 20
+SHARD_SIZE = 8 << 20
+
+# bytes which are not utf-8 pass through unchanged
+ENCODING = 'utf-8'
+ERRORS = 'surrogateescape'
+
+
+class WildcardPattern:
+    """ Compiled pattern of the second string
+
+        the pattern is split by * into literal segments once, the first segment must be the prefix
+        of the string, the last one must be its suffix and the middle ones are searched from left to right,
+        the leftmost place of every segment leaves the most room for the next ones, so there is no backtracking.
+        The string is never sliced and every segment is searched once, so the time is O(n * m) in the worst case
+    """
+
+    __slots__ = ('pattern', 'segments', 'prefix', 'suffix', 'middle', 'min_length', 'has_wildcard')
+
+    def __init__(self, pattern:str):
+        self.pattern = pattern
+        self.segments = pattern.split(WILDCARD)
+        self.has_wildcard = len(self.segments) > 1
+
+        self.prefix = self.segments[0]
+        self.suffix = self.segments[-1] if self.has_wildcard else ''
+        self.middle = tuple(segment for segment in self.segments[1:-1] if segment)
+        self.min_length = len(pattern) - pattern.count(WILDCARD)
+
+    def __repr__(self):
+        return f'WildcardPattern({self.pattern!r})'
+
+    def match(self, string:str) -> bool:
+        """ Function checks if the whole string matches the pattern """
+
+        if not self.has_wildcard:
+            return string == self.pattern
+
+        length = len(string)
+        if length < self.min_length:
+            return False
+
+        prefix = self.prefix
+        suffix = self.suffix
+        if not string.startswith(prefix) or not string.endswith(suffix):
+            return False
+
+        position = len(prefix)
+        end = length - len(suffix)
+        for segment in self.middle:
+            position = string.find(segment, position, end)
+            if position < 0:
+                return False
+            position += len(segment)
+
+        return True
+
+
+class AhoCorasick:
+    """ Automaton finding all given words in a string in one pass
+
+        states are kept in flat lists, goto[state] maps a character to the next state,
+        fail[state] is the state of the longest proper suffix which is also a state,
+        output[state] is the list of word ids ending in the state including the ones of its fail states
+    """
+
+    def __init__(self, words:list):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        for word_id, word in enumerate(words):
+            state = 0
+            for char in word:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            self.output[state].append(word_id)
+
+        self.__build_fail_links()
+
+    def __build_fail_links(self):
+
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        queue = deque(goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+
+                link = fail[state]
+                while link and char not in goto[link]:
+                    link = fail[link]
+                link = goto[link].get(char, 0)
+                fail[next_state] = link if link != next_state else 0
+                output[next_state] = output[next_state] + output[fail[next_state]]
+
+    def find(self, string:str) -> set:
+        """ Function returns ids of the words found in the string """
+
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        found = set()
+        state = 0
+
+        for char in string:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+
+        return found
+
+
+class PatternSet:
+    """ Index of many patterns, it returns all patterns matching a string
+
+        every pattern is indexed by one of its literal parts:
+
+            pattern without *       - dictionary of exact strings
+            pattern with a prefix   - trie of prefixes, the string walks the trie from its first character
+            pattern with a suffix   - trie of reversed suffixes, the string walks it from its last character
+            other patterns          - Aho-Corasick automaton of their longest middle segments
+            patterns of only *      - they match every string
+
+        only the patterns whose literal part is found in the string are checked by WildcardPattern.match
+    """
+
+    def __init__(self, patterns=()):
+        self.patterns = []
+        self.exact = {}
+        self.prefixes = {}
+        self.suffixes = {}
+        self.segments = []
+        self.segment_ids = []
+        self.any = []
+        self.automaton = None
+
+        for pattern in patterns:
+            self.add(pattern)
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def add(self, pattern:str):
+        """ Function adds the pattern to the index """
+
+        pattern_id = len(self.patterns)
+        compiled = compile(pattern)
+        self.patterns.append(compiled)
+
+        if not compiled.has_wildcard:
+            self.exact.setdefault(pattern, []).append(pattern_id)
+        elif compiled.prefix:
+            self.__add_to_trie(self.prefixes, compiled.prefix, pattern_id)
+        elif compiled.suffix:
+            self.__add_to_trie(self.suffixes, reversed(compiled.suffix), pattern_id)
+        elif compiled.middle:
+            self.segments.append(max(compiled.middle, key=len))
+            self.segment_ids.append(pattern_id)
+            self.automaton = None
+        else:
+            self.any.append(pattern_id)
+
+    @staticmethod
+    def __add_to_trie(trie:dict, chars, pattern_id:int):
+
+        node = trie
+        for char in chars:
+            node = node.setdefault(char, {})
+        # None can not be a character, so it keeps ids of patterns ending in the node
+        node.setdefault(None, []).append(pattern_id)
+
+    @staticmethod
+    def __walk_trie(trie:dict, chars, candidates:list):
+
+        node = trie
+        for char in chars:
+            node = node.get(char)
+            if node is None:
+                return
+            candidates.extend(node.get(None, ()))
+
+    def candidates(self, string:str) -> list:
+        """ Function returns ids of the patterns whose literal part is found in the string """
+
+        candidates = list(self.exact.get(string, ()))
+        candidates.extend(self.any)
+
+        if self.prefixes:
+            self.__walk_trie(self.prefixes, string, candidates)
+        if self.suffixes:
+            self.__walk_trie(self.suffixes, reversed(string), candidates)
+
+        if self.segments:
+            if self.automaton is None:
+                self.automaton = AhoCorasick(self.segments)
+            segment_ids = self.segment_ids
+            candidates.extend(segment_ids[i] for i in self.automaton.find(string))
+
+        return candidates
+
+    def match(self, string:str) -> list:
+        """ Function returns all patterns matching the string in the order they were added """
+
+        patterns = self.patterns
+        return [patterns[i].pattern for i in sorted(self.candidates(string)) if patterns[i].match(string)]
+
+
+@functools.lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def compile(pattern:str) -> WildcardPattern:
+    """ Function returns the compiled pattern, the last COMPILE_CACHE_SIZE used patterns are kept,
+        so repeated patterns are not analysed again
+
+        compile.cache_info() returns hits and misses of the cache, compile.cache_clear() empties it
+    """
+
+    return WildcardPattern(pattern)
+
 def is_equal_strings(first_string:str, second_string:str):
+    """ Function returns 'OK' if the first string matches the second one with * wildcards and 'KO' otherwise """
 
-    first_length = len(first_string)
-    second_length = len(second_string)
+    return 'OK' if compile(second_string).match(first_string) else 'KO'
 
-    length = min(first_length, second_length)
-    
-    for i in range(length):
-        first_char = first_string[i]
-        second_char = second_string[i]
-        if first_char != second_char or second_char == '*':
-            if second_char == '*':
-                i += 1
-                k = i
-                while (i < second_length and second_char == '*' ):
-                    second_char = second_string[i]
-                    i += 1
-                if i == second_length and second_char == '*':
-                    return 'OK'
-                if first_char == second_char:
-                    return is_equal_strings(first_string[k - 1:], second_string[i - 1:])
-                while (k < first_length and first_char != second_char):
-                    first_char = first_string[k]
-                    k += 1
-                if k != first_length or first_char == second_char:
-                    return is_equal_strings(first_string[k - 1:], second_string[i - 1:])
-                return 'KO'
-            second_char = second_string[0]
-            if first_char != '*' and second_char == '*':
-                k = i + 1
-                while (k < first_length and first_char != second_char):
-                    first_char = first_string[k]
-                    k += 1
-                if k != first_length:
-                    return is_equal_strings(first_string[k - 1:], second_string)
-                return 'KO'
-            return 'KO'
-
-    if second_length > length:
-        for char in second_string[length:]:
-            if char != '*':
-                return 'KO'
-
-    if first_length > length:
-        return 'KO'
-
-    return 'OK'
+def filter_lines(pattern:WildcardPattern, lines:list, verdicts:bool=False) -> str:
+    """ Function returns the lines matching the pattern or 'OK' and 'KO' verdicts of all lines as one text
+
+        lines have no line endings, \r of \r\n endings is kept in the output but it is not matched
+    """
+
+    match = pattern.match
+
+    if verdicts:
+        return ''.join('OK\n' if match(line.rstrip('\r')) else 'KO\n' for line in lines)
+
+    return ''.join(f'{line}\n' for line in lines if match(line.rstrip('\r')))
+
+def filter_text(pattern:WildcardPattern, data:bytes, verdicts:bool=False) -> bytes:
+    """ Function filters lines of the data which ends at a line boundary """
+
+    lines = data.decode(ENCODING, ERRORS).split('\n')
+    if not lines[-1]:
+        lines.pop()
+
+    return filter_lines(pattern, lines, verdicts).encode(ENCODING, ERRORS)
+
+def read_chunks(source_file, chunk_size:int=CHUNK_SIZE):
+    """ Function reads the binary file by chunks of about chunk_size bytes which end at line boundaries """
+
+    data = source_file.read(chunk_size)
+    while data:
+        if not data.endswith(b'\n'):
+            data += source_file.readline()
+        yield data
+        data = source_file.read(chunk_size)
+
+def read_chunks_until(source_file, end:int, chunk_size:int=CHUNK_SIZE):
+    """ Function works as read_chunks but stops at the end byte, end must be a line boundary """
+
+    position = source_file.tell()
+    while position < end:
+        data = source_file.read(min(chunk_size, end - position))
+        if not data:
+            return
+        if not data.endswith(b'\n') and position + len(data) < end:
+            data += source_file.readline()
+        position += len(data)
+        yield data
+
+def find_shards(file_name:str, shard_size:int=SHARD_SIZE) -> list:
+    """ Function splits the file into (start, end) byte ranges of about shard_size bytes which end at line boundaries """
+
+    size = os.path.getsize(file_name)
+    shards = []
+    start = 0
+
+    with open(file_name, 'rb') as source_file:
+        while start < size:
+            source_file.seek(min(start + shard_size, size))
+            source_file.readline()
+            end = min(source_file.tell(), size)
+            shards.append((start, end))
+            start = end
+
+    return shards
+
+# pattern of the worker process, it is compiled once by init_worker
+_pattern = None
+
+def init_worker(pattern:str):
+
+    global _pattern
+    _pattern = compile(pattern)
+
+def filter_chunk(data:bytes, verdicts:bool) -> bytes:
+    """ Function filters a chunk of lines in the worker process """
+
+    return filter_text(_pattern, data, verdicts)
+
+def filter_shard(file_name:str, start:int, end:int, verdicts:bool) -> bytes:
+    """ Function filters lines of the file between start and end bytes in the worker process """
+
+    with open(file_name, 'rb') as source_file:
+        source_file.seek(start)
+        return b''.join(filter_text(_pattern, data, verdicts) for data in read_chunks_until(source_file, end))
+
+def filter_in_workers(pattern:str, source_file, file_name:str, workers:int, verdicts:bool=False):
+    """ Function filters the file in worker processes, the file is split into shards if file_name is not None
+
+        yield filtered chunks in the order of the lines, at most 2 * workers chunks are in progress
+    """
+
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(pattern,)) as executor:
+        if file_name is None:
+            tasks = ((filter_chunk, data, verdicts) for data in read_chunks(source_file))
+        else:
+            tasks = ((filter_shard, file_name, start, end, verdicts) for start, end in find_shards(file_name))
+
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(*task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+def run_filter(pattern:str, file_name:str=None, workers:int=1, verdicts:bool=False):
+    """ Function prints lines of the file or stdin matching the pattern """
+
+    if file_name == '-':
+        file_name = None
+
+    output = sys.stdout.buffer
+    source_file = sys.stdin.buffer if file_name is None else open(file_name, 'rb')
+
+    with source_file:
+        if workers > 1:
+            chunks = filter_in_workers(pattern, source_file, file_name, workers, verdicts)
+        else:
+            compiled = compile(pattern)
+            chunks = (filter_text(compiled, data, verdicts) for data in read_chunks(source_file))
+
+        for chunk in chunks:
+            output.write(chunk)
+
+    output.flush()
+
+def parse_arguments(arguments:list):
+
+    parser = argparse.ArgumentParser(description='Print lines of the file matching the pattern with * wildcards.')
+    parser.add_argument('--filter', required=True, metavar='PATTERN', help='pattern, * means any characters')
+    parser.add_argument('file_name', nargs='?', help="file with lines, stdin if it is missing or '-'")
+    parser.add_argument('--verdicts', action='store_true', help="print 'OK' or 'KO' for every line")
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
 
+    return parser.parse_args(arguments)
 
 def main():
 
-    if len(sys.argv) != 3:
+    # other arguments starting with -- are strings to compare as before the filter mode
+    if len(sys.argv) > 1 and (sys.argv[1] == '--filter' or sys.argv[1].startswith('--filter=')):
+        arguments = parse_arguments(sys.argv[1:])
+        try:
+            run_filter(arguments.filter, arguments.file_name, arguments.workers, arguments.verdicts)
+        except OSError as error:
+            print(f"Couldn't read the file: {error}", file=sys.stderr)
+            sys.exit(1)
+    elif len(sys.argv) != 3:
         print()
         print("Enter two lines for comparison as command-line arguments, for example: main.py 'a' 'a*'\n\nthe * character in the second line means any combination of any characters")
         print()
@@ -65,7 +414,6 @@ def main():
 
 
 if __name__ == '__main__':
-    import sys
 
     main()
     
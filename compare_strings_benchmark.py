@@ -0,0 +1,255 @@
+""" Benchmarks of compare_strings.py
+
+    To run benchmarks enter 'compare_strings_benchmark.py benchmark_name' in console.
+
+    Available benchmarks:
+
+    matcher - compares WildcardPattern with the previous recursive matcher on long strings
+              and on pathological a*a*a*...b patterns, 'previous' is the result of the recursive matcher
+    filter  - reports lines/sec of filtering generated log lines with WildcardPattern
+    set     - compares PatternSet with checking every pattern for growing numbers of routing patterns
+    cache   - compares repeated matching through compile() with a cold and a warm cache of compiled patterns
+"""
+
+import argparse
+import random
+import sys
+import timeit
+
+from compare_strings import COMPILE_CACHE_SIZE, PatternSet, WildcardPattern, compile, filter_text, is_equal_strings
+
+
+def is_equal_strings_by_recursion(first_string:str, second_string:str):
+    """ The previous matcher, it calls itself on slices of the strings """
+
+    first_length = len(first_string)
+    second_length = len(second_string)
+
+    length = min(first_length, second_length)
+
+    for i in range(length):
+        first_char = first_string[i]
+        second_char = second_string[i]
+        if first_char != second_char or second_char == '*':
+            if second_char == '*':
+                i += 1
+                k = i
+                while (i < second_length and second_char == '*' ):
+                    second_char = second_string[i]
+                    i += 1
+                if i == second_length and second_char == '*':
+                    return 'OK'
+                if first_char == second_char:
+                    return is_equal_strings_by_recursion(first_string[k - 1:], second_string[i - 1:])
+                while (k < first_length and first_char != second_char):
+                    first_char = first_string[k]
+                    k += 1
+                if k != first_length or first_char == second_char:
+                    return is_equal_strings_by_recursion(first_string[k - 1:], second_string[i - 1:])
+                return 'KO'
+            second_char = second_string[0]
+            if first_char != '*' and second_char == '*':
+                k = i + 1
+                while (k < first_length and first_char != second_char):
+                    first_char = first_string[k]
+                    k += 1
+                if k != first_length:
+                    return is_equal_strings_by_recursion(first_string[k - 1:], second_string)
+                return 'KO'
+            return 'KO'
+
+    if second_length > length:
+        for char in second_string[length:]:
+            if char != '*':
+                return 'KO'
+
+    if first_length > length:
+        return 'KO'
+
+    return 'OK'
+
+def generate_cases(length:int) -> list:
+    """ Function returns (name, string, pattern) cases with strings of about length characters """
+
+    words = 'the quick brown fox jumps over the lazy dog '
+    text = (words * (length // len(words) + 1))[:length]
+    stars = max(length // 100, 1)
+
+    return [
+        ('long equal', text, text),
+        ('long prefix*', text, text[:length // 2] + '*'),
+        ('long *suffix', text, '*' + text[length // 2:]),
+        ('long words', text, '*' + '*'.join(text.split()[::7]) + '*'),
+        ('long miss', text, '*' + '*'.join(text.split()[::7]) + '*cat'),
+        ('a*a*...b', 'a' * length, 'a*' * stars + 'b'),
+        ('*a*a*...b', 'a' * length, '*a' * stars + '*b'),
+    ]
+
+def measure(run, repeat:int) -> float:
+    """ Function returns the best time of one run in seconds, inf if run fails """
+
+    try:
+        return min(timeit.repeat(run, number=1, repeat=repeat))
+    except RecursionError:
+        return float('inf')
+
+def benchmark_matcher(length:int, repeat:int):
+
+    print(f'Strings of {length} characters, recursion limit {sys.getrecursionlimit()}')
+    print(f'{"case":>12} {"result":>7} {"previous":>9} {"recursion":>12} {"compiled":>12} {"precompiled":>12}')
+
+    for name, string, pattern in generate_cases(length):
+        compiled = WildcardPattern(pattern)
+
+        timings = (
+            measure(lambda: is_equal_strings_by_recursion(string, pattern), repeat),
+            measure(lambda: is_equal_strings(string, pattern), repeat),
+            measure(lambda: compiled.match(string), repeat),
+        )
+        result = is_equal_strings(string, pattern)
+        try:
+            previous = is_equal_strings_by_recursion(string, pattern)
+        except RecursionError:
+            previous = 'failed'
+
+        timings = ' '.join(f'{timing * 1000:>9.3f} ms' if timing != float('inf') else f'{"failed":>12}'
+                           for timing in timings)
+        print(f'{name:>12} {result:>7} {previous:>9} {timings}')
+
+def generate_log(lines_number:int) -> bytes:
+    """ Function returns lines_number random log lines """
+
+    random.seed(0)
+    methods = ('GET', 'POST', 'PUT', 'DELETE')
+    paths = ('/api/users', '/api/orders', '/api/items', '/static/app.js', '/health')
+    statuses = ('200', '201', '304', '404', '500')
+
+    return ''.join(f'{random.choice(methods)} {random.choice(paths)}/{random.randrange(1000)} '
+                   f'{random.choice(statuses)} {random.randrange(1000)} ms\n' for _ in range(lines_number)).encode()
+
+def benchmark_filter(lines_number:int, repeat:int):
+
+    data = generate_log(lines_number)
+    patterns = ('GET /api/users/*', '* 500 *', '*/api/*/1* 404 *ms', 'POST /health 200 1 ms')
+
+    print(f'{lines_number} lines, {len(data) / 2 ** 20:.1f} MB')
+    for pattern in patterns:
+        compiled = WildcardPattern(pattern)
+        elapsed = measure(lambda: filter_text(compiled, data), repeat)
+        matched = filter_text(compiled, data).count(b'\n')
+        print(f'{pattern:>24}: {matched:>8} matched, {lines_number / elapsed:.0f} lines/sec')
+
+def generate_routes(patterns_number:int, strings_number:int) -> tuple:
+    """ Function returns routing patterns and request paths, about a half of the paths match some pattern """
+
+    random.seed(0)
+    words = [f'{word}{i}' for i in range(patterns_number // 10 + 1) for word in ('users', 'orders', 'items', 'files')]
+    extensions = ('png', 'js', 'css', 'html', 'json')
+
+    patterns = []
+    for i in range(patterns_number):
+        word = random.choice(words)
+        kind = i % 4
+        if kind == 0:
+            patterns.append(f'/api/v{i % 3}/{word}/*')
+        elif kind == 1:
+            patterns.append(f'*/{word}.{random.choice(extensions)}')
+        elif kind == 2:
+            patterns.append(f'*/{word}/*/edit*')
+        else:
+            patterns.append(f'/static/{word}/*.{random.choice(extensions)}')
+
+    strings = []
+    for _ in range(strings_number):
+        path = '/'.join(random.choice(words) for _ in range(random.randint(1, 3)))
+        strings.append(random.choice((f'/api/v{random.randrange(4)}/{path}', f'/static/{path}.{random.choice(extensions)}',
+                                      f'/{path}/{random.randrange(100)}/edit', f'/web/{path}')))
+
+    return patterns, strings
+
+def benchmark_set(strings_number:int, repeat:int):
+
+    print(f'{"patterns":>8} {"PatternSet":>18} {"every pattern":>18} {"is_equal_strings":>18} {"candidates":>11}')
+
+    for patterns_number in (10, 100, 1000, 10000):
+        patterns, strings = generate_routes(patterns_number, strings_number)
+        pattern_set = PatternSet(patterns)
+        compiled = [WildcardPattern(pattern) for pattern in patterns]
+
+        def check_every_pattern():
+            return [[pattern.pattern for pattern in compiled if pattern.match(string)] for string in strings]
+
+        if check_every_pattern() != [pattern_set.match(string) for string in strings]:
+            raise AssertionError('PatternSet results differ from checking every pattern')
+
+        timings = [measure(lambda: [pattern_set.match(string) for string in strings], repeat),
+                   measure(check_every_pattern, repeat)]
+        # the slowest variant is measured once on a part of the strings
+        part = strings[:max(strings_number * 100 // patterns_number, 1)]
+        timings.append(measure(lambda: [[pattern for pattern in patterns if is_equal_strings(string, pattern) == 'OK']
+                                        for string in part], 1) * len(strings) / len(part))
+
+        candidates = sum(len(pattern_set.candidates(string)) for string in strings) / len(strings)
+        print(f'{patterns_number:>8} ' + ' '.join(f'{strings_number / timing:>10.0f} str/sec' for timing in timings) +
+              f' {candidates:>11.1f}')
+
+def benchmark_cache(strings_number:int, repeat:int):
+
+    patterns, strings = generate_routes(COMPILE_CACHE_SIZE // 2, strings_number)
+    queries = [(string, patterns[i % len(patterns)]) for i, string in enumerate(strings * 10)]
+
+    def match_all():
+        return [compile(pattern).match(string) for string, pattern in queries]
+
+    def match_cold():
+        compile.cache_clear()
+        return match_all()
+
+    variants = (
+        ('no cache', lambda: [WildcardPattern(pattern).match(string) for string, pattern in queries]),
+        ('cold cache', match_cold),
+        ('warm cache', match_all),
+        ('is_equal_strings', lambda: [is_equal_strings(string, pattern) for string, pattern in queries]),
+    )
+
+    print(f'{len(queries)} queries, {len(set(patterns))} distinct patterns, cache size {COMPILE_CACHE_SIZE}')
+    for name, run in variants:
+        compile.cache_clear()
+        if name != 'cold cache':
+            run()
+        elapsed = measure(run, repeat)
+
+        # hits and misses of one more run, the cold run starts with the empty cache
+        before = compile.cache_info() if name != 'cold cache' else (0, 0)
+        run()
+        after = compile.cache_info()
+        hits = after[0] - before[0]
+        misses = after[1] - before[1]
+        hit_rate = hits / (hits + misses) if hits + misses else 0
+
+        print(f'{name:>16}: {len(queries) / elapsed:>9.0f} queries/sec, hits: {hits}, misses: {misses}, '
+              f'hit rate: {hit_rate:.1%}')
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmarks of compare_strings.py')
+    parser.add_argument('benchmark', choices=('matcher', 'filter', 'set', 'cache'))
+    parser.add_argument('--length', type=int, default=100000, help='length of the strings in the matcher benchmark')
+    parser.add_argument('--lines', type=int, default=1000000, help='number of lines in the filter benchmark')
+    parser.add_argument('--strings', type=int, default=2000, help='number of strings in the set and cache benchmarks')
+    parser.add_argument('--repeat', type=int, default=5, help='how many times every case is measured')
+    arguments = parser.parse_args()
+
+    if arguments.benchmark == 'matcher':
+        benchmark_matcher(arguments.length, arguments.repeat)
+    elif arguments.benchmark == 'filter':
+        benchmark_filter(arguments.lines, arguments.repeat)
+    elif arguments.benchmark == 'set':
+        benchmark_set(arguments.strings, arguments.repeat)
+    elif arguments.benchmark == 'cache':
+        benchmark_cache(arguments.strings, arguments.repeat)
+
+
+if __name__ == '__main__':
+
+    main()
@@ -8,14 +8,171 @@
     (value must correspond base_system)
     
     Note: the value to convert must be non-negative
+
+    'program_name.py --bulk source_base target_base file_name' to convert every line of the file,
+    one result line for every line,
+    values are read from stdin if file_name is missing or '-'
+
+    'program_name.py --stream source_base target_base file_name' to convert one value of any length
+    whose digits fill the file, the digits are read by chunks
+
+    Values with thousands of digits are converted by splitting them on powers of the base,
+    so the time grows slower than the square of the number of digits.
+
+    BaseCodec encodes and decodes integers in the library code, with custom alphabets like base58
+    and base62 and with fixed-width digits which sort as the numbers.
 """
 
+import argparse
+import functools
+import sys
+
+DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+# numbers with at most LEAF_DIGITS digits are converted directly, it is far below
+# the limit of int() and str() for numbers in not power of two bases (4300 digits)
+LEAF_DIGITS = 512
+
+# int() and format() convert numbers in power of two bases in linear time and without the limit
+POWER_OF_TWO_BASES = (2, 4, 8, 16, 32)
+FORMAT_SPECS = {2: 'b', 8: 'o', 16: 'X'}
+
+# value of every byte as a digit, INVALID_DIGIT for bytes which are not digits
+INVALID_DIGIT = 255
+DIGIT_VALUES = bytes(DIGITS.find(chr(char).upper()) if chr(char).isalnum() and chr(char).isascii() else INVALID_DIGIT
+                     for char in range(256))
+
+# result of values which are not numbers, also of blank lines of the bulk mode
+WRONG_VALUE = 'Wrong value to convert. The value to convert must be non-negative number'
+
+CHUNK_SIZE = 1 << 20
+
+
+@functools.lru_cache(maxsize=None)
+def get_power(base:int, digits:int) -> int:
+    """ Function returns base ** digits, powers are cached, so every power is computed once """
+
+    if digits > LEAF_DIGITS and digits % 2 == 0:
+        return get_power(base, digits // 2) ** 2
+    return base ** digits
+
+def get_split_digits(base:int, nb:int) -> int:
+    """ Function returns the biggest number of digits LEAF_DIGITS * 2 ** k for which base ** digits <= nb """
+
+    digits = LEAF_DIGITS
+    while get_power(base, 2 * digits) <= nb:
+        digits *= 2
+    return digits
+
+def convert_leaf(nb:int, base:int, alphabet:str=DIGITS) -> str:
+
+    if base == 10:
+        return str(nb)
+
+    based = []
+    while nb >= base:
+        nb, digit = divmod(nb, base)
+        based.append(alphabet[digit])
+    based.append(alphabet[nb])
+    return ''.join(based[::-1])
+
+def write_digits(nb:int, base:int, width:int, parts:list, alphabet:str=DIGITS):
+    """ Function appends digits of nb padded with zeros to width to parts
+
+        nb is split into the high and the low halves by a power of the base, so big numbers
+        are divided only a few times instead of once for every digit
+    """
+
+    if nb < get_power(base, LEAF_DIGITS):
+        parts.append(convert_leaf(nb, base, alphabet).rjust(width, alphabet[0]))
+        return
+
+    digits = get_split_digits(base, nb)
+    high, low = divmod(nb, get_power(base, digits))
+    write_digits(high, base, width - digits, parts, alphabet)
+    write_digits(low, base, digits, parts, alphabet)
+
+def int_to_digits(nb:int, base:int, alphabet:str=DIGITS) -> str:
+    """ Function returns digits of the non-negative number in the base from 2 to 36,
+        bases above 36 need the alphabet of their digits
+    """
+
+    if base in FORMAT_SPECS:
+        return format(nb, FORMAT_SPECS[base])
+
+    parts = []
+    write_digits(nb, base, 0, parts, alphabet)
+    return ''.join(parts)
+
+def digits_to_int(digits:str, base:int) -> int:
+    """ Function returns the number of the digits in the base from 2 to 36, digits must be valid
+
+        long strings are split into the high and the low parts, the parts are converted by int()
+        and joined by multiplication by a cached power of the base
+    """
+
+    length = len(digits)
+    if not length:
+        return 0
+    if length <= LEAF_DIGITS or base in POWER_OF_TWO_BASES:
+        return int(digits, base)
+
+    low_digits = LEAF_DIGITS
+    while 2 * low_digits < length:
+        low_digits *= 2
+
+    split = length - low_digits
+    return digits_to_int(digits[:split], base) * get_power(base, low_digits) + digits_to_int(digits[split:], base)
+
+@functools.lru_cache(maxsize=4096)
+def to_ascii_digit(char:str) -> str:
+    """ Function returns the ascii digit of the decimal digit or of the letter or '?' which is not a digit
+
+        upper() of some characters has several characters ('ß' is 'SS'), they are not digits
+    """
+
+    if char.isdecimal():
+        return str(int(char))
+    upper = char.upper()
+    if len(upper) == 1 and upper.isascii() and upper.isalnum():
+        return upper
+    return '?'
+
+def to_ascii_digits(nb:str) -> str:
+    """ Function replaces other decimal digits by ascii digits and letters by upper case letters,
+        other characters by '?', so they are reported as wrong values
+    """
+
+    if nb.isascii():
+        return nb
+    return ''.join(char if char.isascii() else to_ascii_digit(char) for char in nb)
+
+def check_digits(data:bytes, base:int, negative:bool=False) -> str:
+    """ Function checks digits of the base in one pass over DIGIT_VALUES, return error message or empty string
+
+        negative tells if the whole value starts with '-'
+    """
+
+    top = max(data.translate(DIGIT_VALUES), default=0)
+    if top == INVALID_DIGIT:
+        if negative:
+            return 'The value to convert must be non-negative'
+        return WRONG_VALUE
+    if top >= base:
+        return 'Wrong base number system'
+    return ''
+
+def parse_decimal(value:str) -> int:
+    """ Function converts the decimal value of the command line, long values are converted by digits_to_int """
+
+    digits = value[1:] if value.startswith('-') else value
+    if len(digits) > LEAF_DIGITS and digits.isascii() and digits.isdigit():
+        nb = digits_to_int(digits, 10)
+        return -nb if value.startswith('-') else nb
+    return int(value)
 
 def i_to_base(nb:int, base:str):
     """ Function converts number from decimal system to any other """
-    
-    digits_in_letters = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M',
-    'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z']
 
     try:
         base = int(base)
@@ -30,27 +187,12 @@ def i_to_base(nb:int, base:str):
             return '|' * nb
         if nb < base:
             return str(nb)
-        
-        based = [];
-        while (nb >= base):
-            digit = nb % base
-            nb //= base
-            if digit >= 10:          
-                based.append(digits_in_letters[digit - 10])
-            else:
-                based.append(str(digit))
-                
-        if nb >= 10:          
-            based.append(digits_in_letters[nb - 10])
-        else:
-            based.append(str(nb))
-        return ''.join(based[::-1])
+
+        return int_to_digits(nb, base)
 
 def i_to_base_all(nb:str, base_src:str, base_dst:str):
     """ Function converts nb from base_srs to base_dst """
 
-    allow_dictionary = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M',
-    'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z']
     try:
         base_src = int(base_src)
         base_dst = int(base_dst)
@@ -61,41 +203,377 @@ def i_to_base_all(nb:str, base_src:str, base_dst:str):
             return f'{nb} from "{base_src}" to "{base_dst}"'
         if base_src == 1:
             return i_to_base(len(nb), base_dst)
-        
-        if nb.isdigit():
-            for digit in nb:
-                if int(digit) >= base_src:
-                    return 'Wrong base number system'
-        else:
-            for char in nb:
-                if not char.isdigit() and char.upper() not in allow_dictionary:
-                    if char == '-' and nb.index(char) == 0:
-                        return 'The value to convert must be non-negative'
-                    return 'Wrong value to convert. The value to convert must be non-negative number'
-            for char in nb:       
-                char = int(char) if char.isdigit() else allow_dictionary.index(char.upper()) + 10
-                if char >= base_src:
-                    return 'Wrong base number system'
-                
-        nb = list(nb)
-        in_decimal = 0;
-        power = 0
-        while(nb):
-            digit = nb.pop()
-            digit = int(digit) if digit.isdigit() else allow_dictionary.index(digit.upper()) + 10
-            in_decimal += digit * base_src **  power
-            power += 1        
+
+        nb = to_ascii_digits(nb)
+        error = check_digits(nb.encode('ascii', 'replace'), base_src, nb.startswith('-'))
+        if error:
+            return error
+
+        in_decimal = digits_to_int(nb, base_src)
         return i_to_base(in_decimal, base_dst)
             
 
+@functools.lru_cache(maxsize=None)
+def get_valid_bytes(base:int) -> bytes:
+    """ Function returns bytes of the digits of the base in upper and lower case """
+
+    return bytes(char for char in range(256) if DIGIT_VALUES[char] < base)
+
+@functools.lru_cache(maxsize=None)
+def get_digit_pairs(base:int) -> tuple:
+    """ Function returns digits of all values below base ** 2 as two characters,
+        so the output is built two digits at once
+    """
+
+    return tuple(DIGITS[value // base] + DIGITS[value % base] for value in range(base ** 2))
+
+def encode_many(numbers, base:int) -> list:
+    """ Function returns digits of non-negative numbers in the base from 2 to 36
+
+        numbers below the base are returned as decimal numbers as i_to_base does
+    """
+
+    if base in FORMAT_SPECS:
+        spec = FORMAT_SPECS[base]
+        return [str(nb) if nb < base else format(nb, spec) for nb in numbers]
+
+    pairs = get_digit_pairs(base)
+    square = base ** 2
+    limit = get_power(base, LEAF_DIGITS)
+    encoded = []
+    add = encoded.append
+
+    for nb in numbers:
+        if nb < base:
+            add(str(nb))
+        elif nb >= limit:
+            add(int_to_digits(nb, base))
+        elif base == 10:
+            add(str(nb))
+        else:
+            based = []
+            while nb >= square:
+                nb, pair = divmod(nb, square)
+                based.append(pairs[pair])
+            based.append(pairs[nb].lstrip('0'))
+            add(''.join(based[::-1]))
+
+    return encoded
+
+def convert_many(values, base_src:int, base_dst:int) -> list:
+    """ Function converts values from base_src to base_dst and returns the same results as i_to_base_all
+
+        values of bases from 2 to 36 with only valid ascii digits are decoded by int() at once,
+        other values are converted by i_to_base_all
+    """
+
+    values = list(values)
+    if not (2 <= base_src <= 36 and 2 <= base_dst <= 36):
+        return [i_to_base_all(value, str(base_src), str(base_dst)) for value in values]
+
+    valid_bytes = get_valid_bytes(base_src)
+    numbers = []
+    invalid = []
+
+    for i, value in enumerate(values):
+        if value and value.isascii() and not value.encode().translate(None, valid_bytes):
+            numbers.append(digits_to_int(value, base_src))
+        else:
+            invalid.append(i)
+            numbers.append(0)
+
+    results = encode_many(numbers, base_dst)
+    for i in invalid:
+        results[i] = i_to_base_all(values[i], str(base_src), str(base_dst))
+
+    return results
+
+def convert_chunk(data:bytes, base_src:int, base_dst:int) -> bytes:
+    """ Function converts every line of the chunk and returns one result line for every line,
+        so results can be paired with the input, blank lines get the wrong value message
+    """
+
+    lines = data.decode('utf-8', 'replace').split('\n')
+    if data.endswith(b'\n'):
+        del lines[-1]
+
+    values = [line.strip() for line in lines]
+    results = convert_many([value for value in values if value], base_src, base_dst)
+    results.reverse()
+
+    return ''.join(f'{results.pop() if value else WRONG_VALUE}\n' for value in values).encode()
+
+def read_chunks(source_file, chunk_size:int=CHUNK_SIZE):
+    """ Function reads the binary file by chunks of about chunk_size bytes which end at line boundaries """
+
+    data = source_file.read(chunk_size)
+    while data:
+        if not data.endswith(b'\n'):
+            data += source_file.readline()
+        yield data
+        data = source_file.read(chunk_size)
+
+def run_bulk(base_src:int, base_dst:int, file_name:str=None):
+    """ Function converts every line of the file or stdin and writes the results to stdout by chunks """
+
+    if file_name == '-':
+        file_name = None
+
+    output = sys.stdout.buffer
+    source_file = sys.stdin.buffer if file_name is None else open(file_name, 'rb')
+
+    with source_file:
+        for data in read_chunks(source_file):
+            output.write(convert_chunk(data, base_src, base_dst))
+
+    output.flush()
+
+def decode_stream(source_file, base:int, chunk_size:int=CHUNK_SIZE) -> int:
+    """ Function decodes one value whose digits fill the binary file, line breaks between digits are skipped
+
+        digits are read by chunks and converted by pieces of chunk_size digits, pieces of the same size
+        are joined at once like carries of a binary counter, so only the stack of partial values is kept
+        and every join multiplies numbers of about the same size
+
+        raise ValueError with the message of i_to_base_all if the file has wrong digits
+    """
+
+    if not 2 <= base <= 36:
+        raise ValueError(f'"{base}"')
+
+    stack = []
+    pending = b''
+    first = True
+
+    def push(piece:bytes):
+        value = digits_to_int(piece.decode('ascii'), base)
+        digits = len(piece)
+        while stack and stack[-1][1] == digits:
+            high, _ = stack.pop()
+            value = high * get_power(base, digits) + value
+            digits *= 2
+        stack.append((value, digits))
+
+    data = source_file.read(chunk_size)
+    while data:
+        data = data.translate(None, b'\r\n')
+        error = check_digits(data, base, first and data.startswith(b'-'))
+        if error:
+            raise ValueError(error)
+        if data:
+            first = False
+
+        pending += data
+        while len(pending) >= chunk_size:
+            push(pending[:chunk_size])
+            pending = pending[chunk_size:]
+
+        data = source_file.read(chunk_size)
+
+    # the rest and the stack are joined from the lowest digits
+    nb = digits_to_int(pending.decode('ascii'), base)
+    digits = len(pending)
+    while stack:
+        high, high_digits = stack.pop()
+        nb = high * base ** digits + nb
+        digits += high_digits
+
+    return nb
+
+def run_stream(base_src:int, base_dst:int, file_name:str=None):
+    """ Function prints the value whose digits fill the file or stdin in base_dst """
+
+    if file_name == '-':
+        file_name = None
+
+    source_file = sys.stdin.buffer if file_name is None else open(file_name, 'rb')
+    with source_file:
+        try:
+            nb = decode_stream(source_file, base_src)
+        except ValueError as error:
+            print(error)
+            return
+
+    print(i_to_base(nb, str(base_dst)))
+
+BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+BASE62_ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+
+# ascii digit of every value below 36, digits of other alphabets are translated to them to use int()
+VALUE_DIGITS = bytes(ord(DIGITS[value]) if value < len(DIGITS) else 0 for value in range(256))
+
+
+@functools.lru_cache(maxsize=None)
+def get_codec_tables(base:int, alphabet:str) -> tuple:
+    """ Function builds tables of the codec once for every base and alphabet
+
+        return decode table of 256 values of bytes (INVALID_DIGIT for bytes which are not digits),
+        table of str.translate from DIGITS to the alphabet or None if the alphabet is DIGITS,
+        digits of all values below base ** 2 as two characters
+    """
+
+    if alphabet == DIGITS[:base]:
+        # the default alphabet is case insensitive like int()
+        decode_table = bytes(value if value < base else INVALID_DIGIT for value in DIGIT_VALUES)
+        to_alphabet = None
+    else:
+        values = {ord(char): value for value, char in enumerate(alphabet)}
+        decode_table = bytes(values.get(char, INVALID_DIGIT) for char in range(256))
+        to_alphabet = str.maketrans(DIGITS[:base], alphabet) if base <= len(DIGITS) else None
+
+    pairs = tuple(alphabet[value // base] + alphabet[value % base] for value in range(base ** 2))
+
+    return decode_table, to_alphabet, pairs
+
+def values_to_int(values:bytes, base:int) -> int:
+    """ Function returns the number of digit values in any base, long values are split like in digits_to_int """
+
+    length = len(values)
+    if length <= LEAF_DIGITS:
+        nb = 0
+        for value in values:
+            nb = nb * base + value
+        return nb
+
+    low_digits = LEAF_DIGITS
+    while 2 * low_digits < length:
+        low_digits *= 2
+
+    split = length - low_digits
+    return values_to_int(values[:split], base) * get_power(base, low_digits) + values_to_int(values[split:], base)
+
+
+class BaseCodec:
+    """ Encoder and decoder of non-negative integers in the base with the alphabet of its digits
+
+        the alphabet is DIGITS by default (decoding is case insensitive then), BASE58_ALPHABET and
+        BASE62_ALPHABET or any string of different ascii characters can be used,
+        tables are built once for every base and alphabet and shared by codecs
+
+        if width is set, digits are padded by the zero digit of the alphabet to width,
+        so encoded numbers sort as numbers if the alphabet is sorted
+    """
+
+    __slots__ = ('base', 'alphabet', 'width', 'decode_table', 'to_alphabet', 'pairs', 'small_limit', 'format_spec')
+
+    def __init__(self, base:int, alphabet:str=None, width:int=0):
+        if alphabet is None:
+            alphabet = DIGITS[:base] if base <= len(DIGITS) else BASE62_ALPHABET[:base]
+
+        if base < 2:
+            raise ValueError('The base must be at least 2')
+        if len(alphabet) != base:
+            raise ValueError(f'The alphabet must have {base} digits')
+        if not alphabet.isascii() or len(set(alphabet)) != base:
+            raise ValueError('The alphabet must have different ascii characters')
+        if width < 0:
+            raise ValueError('The width must be non-negative')
+
+        self.base = base
+        self.alphabet = alphabet
+        self.width = width
+        self.decode_table, self.to_alphabet, self.pairs = get_codec_tables(base, alphabet)
+        self.small_limit = get_power(base, LEAF_DIGITS)
+
+        # format() pads digits itself and is faster than the tables in its bases
+        format_spec = FORMAT_SPECS.get(base, 'd' if base == 10 else None)
+        self.format_spec = f'0{width}{format_spec}' if format_spec and self.to_alphabet is None else None
+
+    def __repr__(self):
+        return f'BaseCodec({self.base}, {self.alphabet!r}, width={self.width})'
+
+    def encode(self, nb:int) -> str:
+        """ Function returns digits of the non-negative number """
+
+        if nb < 0:
+            raise ValueError('The value to encode must be non-negative')
+
+        base = self.base
+        if self.format_spec and nb < self.small_limit:
+            digits = format(nb, self.format_spec)
+            if self.width and len(digits) > self.width:
+                raise ValueError(f'The value needs more than {self.width} digits')
+            return digits
+
+        if nb >= self.small_limit:
+            if self.base <= len(DIGITS):
+                digits = int_to_digits(nb, base)
+                if self.to_alphabet is not None:
+                    digits = digits.translate(self.to_alphabet)
+            else:
+                digits = int_to_digits(nb, base, self.alphabet)
+        elif nb < base:
+            digits = self.alphabet[nb]
+        else:
+            # two digits at once
+            pairs = self.pairs
+            square = base * base
+            based = []
+            while nb >= square:
+                nb, pair = divmod(nb, square)
+                based.append(pairs[pair])
+            based.append(pairs[nb] if nb >= base else self.alphabet[nb])
+            digits = ''.join(based[::-1])
+
+        if self.width:
+            if len(digits) > self.width:
+                raise ValueError(f'The value needs more than {self.width} digits')
+            return digits.rjust(self.width, self.alphabet[0])
+        return digits
+
+    def decode(self, digits:str) -> int:
+        """ Function returns the number of the digits, raise ValueError if they are not digits of the alphabet """
+
+        try:
+            values = digits.encode('ascii').translate(self.decode_table)
+        except UnicodeEncodeError:
+            values = b''
+        if not values or max(values) >= self.base:
+            raise ValueError(f'Wrong digits for base {self.base}: {digits!r}')
+
+        if self.base <= len(DIGITS):
+            return digits_to_int(values.translate(VALUE_DIGITS).decode('ascii'), self.base)
+        return values_to_int(values, self.base)
+
+    def encode_many(self, numbers) -> list:
+        encode = self.encode
+        return [encode(nb) for nb in numbers]
+
+    def decode_many(self, strings) -> list:
+        decode = self.decode
+        return [decode(digits) for digits in strings]
+
+
+def parse_arguments(arguments:list):
+
+    parser = argparse.ArgumentParser(description='Convert values of the file from source_base to target_base.')
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--bulk', action='store_true', help='convert every line of the file or stdin')
+    mode.add_argument('--stream', action='store_true', help='convert one long value whose digits fill the file or stdin')
+    parser.add_argument('source_base', type=int, help='number system of the values')
+    parser.add_argument('target_base', type=int, help='number system of the results')
+    parser.add_argument('file_name', nargs='?', help="file with values, stdin if it is missing or '-'")
+
+    return parser.parse_args(arguments)
+
 def main():
 
+    if len(sys.argv) > 1 and sys.argv[1] in ('--bulk', '--stream'):
+        arguments = parse_arguments(sys.argv[1:])
+        run = run_bulk if arguments.bulk else run_stream
+        try:
+            run(arguments.source_base, arguments.target_base, arguments.file_name)
+        except OSError as error:
+            print(f"Couldn't read the file: {error}", file=sys.stderr)
+            sys.exit(1)
+        return
+
     usage = '\nTo convert from the decimal system:\n\n enter the program file name, decimal number, and target number system as command-line arguments, for example: main.py 15 5\n\nFor translation from an arbitrary number system:\n\n enter the program file name, number, source and target number system as command-line arguments, for example: main.py 15 5 2\n\nNote: the value to convert must be non-negative\n'
     
     if 2 < len(sys.argv) < 5:
         if len(sys.argv) < 4:
             try:
-                nb = int(sys.argv[1])
+                nb = parse_decimal(sys.argv[1])
                 if nb < 0:
                     raise TypeError
             except TypeError:
@@ -121,7 +599,5 @@ def main():
             
 if __name__ == '__main__':
     
-    import sys
-    
     main()
     
@@ -0,0 +1,148 @@
+""" Benchmarks of number_converter.py
+
+    To run benchmarks enter 'number_converter_benchmark.py benchmark_name' in console.
+
+    Available benchmarks:
+
+    large - compares divide-and-conquer conversion with the previous per-digit conversion and with
+            int() and str() without the digits limit for values of growing number of digits
+    bulk  - compares throughput of convert_many and convert_chunk with i_to_base_all called for every value
+    codec - compares BaseCodec.encode_many and decode_many with format() and int() in several bases
+"""
+
+import argparse
+import random
+import sys
+import timeit
+
+from number_converter import (BASE58_ALPHABET, DIGITS, BaseCodec, convert_chunk, convert_many, digits_to_int, i_to_base_all,
+                              int_to_digits)
+
+
+def digits_to_int_by_powers(digits:str, base:int) -> int:
+    """ The previous conversion to decimal, every digit is multiplied by its own power of the base """
+
+    digits = list(digits)
+    in_decimal = 0
+    power = 0
+    while digits:
+        digit = DIGITS.index(digits.pop().upper())
+        in_decimal += digit * base ** power
+        power += 1
+    return in_decimal
+
+def int_to_digits_by_division(nb:int, base:int) -> str:
+    """ The previous conversion from decimal, the number is divided once for every digit """
+
+    based = []
+    while nb >= base:
+        digit = nb % base
+        nb //= base
+        based.append(DIGITS[digit])
+    based.append(DIGITS[nb])
+    return ''.join(based[::-1])
+
+def measure(run, repeat:int) -> float:
+
+    return min(timeit.repeat(run, number=1, repeat=repeat))
+
+def benchmark_large(lengths:list, baseline_limit:int, repeat:int):
+
+    # the limit of int() and str() is removed only to compare with them
+    sys.set_int_max_str_digits(0)
+    random.seed(0)
+
+    print(f'{"digits":>8} {"conversion":>16} {"previous":>12} {"new":>12} {"builtin":>12}')
+    for length in lengths:
+        decimal = str(random.randrange(1, 10)) + ''.join(random.choice('0123456789') for _ in range(length - 1))
+        nb = int(decimal)
+        base36 = int_to_digits(nb, 36)
+
+        cases = (
+            ('10 -> int', lambda: digits_to_int_by_powers(decimal, 10), lambda: digits_to_int(decimal, 10),
+             lambda: int(decimal)),
+            ('int -> 10', lambda: int_to_digits_by_division(nb, 10), lambda: int_to_digits(nb, 10), lambda: str(nb)),
+            ('36 -> int', lambda: digits_to_int_by_powers(base36, 36), lambda: digits_to_int(base36, 36),
+             lambda: int(base36, 36)),
+            ('int -> 36', lambda: int_to_digits_by_division(nb, 36), lambda: int_to_digits(nb, 36), None),
+        )
+
+        for name, previous, new, builtin in cases:
+            timings = [
+                measure(previous, 1) if length <= baseline_limit else None,
+                measure(new, repeat),
+                measure(builtin, repeat) if builtin else None,
+            ]
+            timings = ' '.join(f'{timing * 1000:>9.2f} ms' if timing is not None else f'{"-":>12}' for timing in timings)
+            print(f'{length:>8} {name:>16} {timings}')
+
+def benchmark_bulk(values_number:int, repeat:int):
+
+    random.seed(0)
+    decimal = [str(random.randrange(10 ** 12)) for _ in range(values_number)]
+    base36 = convert_many(decimal, 10, 36)
+
+    print(f'{values_number} values')
+    for name, values, base_src, base_dst in (('10 -> 36', decimal, 10, 36), ('36 -> 10', base36, 36, 10),
+                                             ('10 -> 7', decimal, 10, 7)):
+        data = ''.join(f'{value}\n' for value in values).encode()
+        variants = (
+            ('i_to_base_all', lambda: [i_to_base_all(value, str(base_src), str(base_dst)) for value in values]),
+            ('convert_many', lambda: convert_many(values, base_src, base_dst)),
+            ('convert_chunk', lambda: convert_chunk(data, base_src, base_dst)),
+        )
+        for variant, run in variants:
+            elapsed = measure(run, repeat)
+            print(f'{name:>10} {variant:>14}: {values_number / elapsed:>10.0f} values/sec')
+
+def benchmark_codec(values_number:int, repeat:int):
+
+    random.seed(0)
+    numbers = [random.randrange(2 ** 64) for _ in range(values_number)]
+
+    print(f'{values_number} values below 2 ** 64')
+    print(f'{"codec":>22} {"encode":>18} {"decode":>18} {"builtin encode":>18} {"builtin decode":>18}')
+    for base, alphabet, width in ((10, None, 0), (10, None, 20), (16, None, 0), (16, None, 16), (36, None, 0),
+                                  (58, BASE58_ALPHABET, 0), (58, BASE58_ALPHABET, 11), (62, None, 0)):
+        codec = BaseCodec(base, alphabet, width)
+        strings = codec.encode_many(numbers)
+        if codec.decode_many(strings) != numbers:
+            raise AssertionError(f'{codec} does not decode its own digits')
+
+        timings = [measure(lambda: codec.encode_many(numbers), repeat),
+                   measure(lambda: codec.decode_many(strings), repeat)]
+        # builtins exist only for some bases
+        if base in (10, 16):
+            spec = f'0{width}{"d" if base == 10 else "X"}'
+            timings.append(measure(lambda: [format(nb, spec) for nb in numbers], repeat))
+        else:
+            timings.append(None)
+        timings.append(measure(lambda: [int(digits, base) for digits in strings], repeat) if base <= 36 else None)
+
+        name = f'base {base}' + (' base58' if alphabet == BASE58_ALPHABET else '') + (f' width {width}' if width else '')
+        print(f'{name:>22} ' + ' '.join(f'{values_number / timing:>10.0f} val/sec' if timing else f'{"-":>18}'
+                                        for timing in timings))
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmarks of number_converter.py')
+    parser.add_argument('benchmark', choices=('large', 'bulk', 'codec'))
+    parser.add_argument('--lengths', type=int, nargs='+', default=[1000, 10000, 100000, 300000],
+                        help='numbers of decimal digits of the converted values')
+    parser.add_argument('--baseline-limit', type=int, default=20000,
+                        help='the previous conversion is measured only for values with at most this number of digits')
+    parser.add_argument('--values', type=int, default=200000, help='number of values in the bulk and codec benchmarks')
+    parser.add_argument('--repeat', type=int, default=3, help='how many times every conversion is measured')
+    arguments = parser.parse_args()
+
+    if arguments.benchmark == 'large':
+        benchmark_large(arguments.lengths, arguments.baseline_limit, arguments.repeat)
+    elif arguments.benchmark == 'bulk':
+        benchmark_bulk(arguments.values, arguments.repeat)
+    elif arguments.benchmark == 'codec':
+        benchmark_codec(arguments.values, arguments.repeat)
+
+
+if __name__ == '__main__':
+
+    main()
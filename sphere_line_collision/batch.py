@@ -0,0 +1,477 @@
+""" Batch collision engine for many lines and spheres at once.
+
+    Lines and spheres are passed as sequences of rows:
+
+        lines   - (x1, y1, z1, x2, y2, z2) for every line
+        spheres - (cx, cy, cz, radius) for every sphere
+
+    Instead of building Point objects for every record the functions walk over the columns
+    of these rows and return flat arrays:
+
+        hits   - bytearray with the number of collision points (0, 1 or 2) of every record
+        first  - array of floats, x, y, z of the first collision point of every record
+        second - array of floats, x, y, z of the second collision point of every record
+
+    Coordinates of missing points are nan.
+
+    LineArray and SphereArray objects or sequences of Line and Sphere objects can be passed instead of rows.
+
+    If numpy is installed, batches of at least NUMPY_MIN_RECORDS records are computed as whole-array
+    operations (solve_columns_numpy), otherwise and for smaller batches by loops over the columns.
+    Set USE_NUMPY to False to use only the loops.
+
+    The scalar functions in sphere_line_collision.py are the reference implementation,
+    the loops compute every record with exactly the same arithmetic as there, numpy rounds squares
+    and roots differently from pow(), so its points may differ in the last bits and tangent lines
+    may get a different number of points with eps equal to zero.
+    A line with equal points has no direction, so both here and there it is reported as having no collision.
+    test_batch.py checks the batch functions against the scalar ones.
+
+    Query modes:
+
+        all          - both collision points of the infinite line
+        ray          - collision points with t >= 0, so the ray from point1 through point2
+        segment_only - collision points with 0 <= t <= 1, so only points between point1 and point2
+        first_hit    - the collision point of the segment which is the nearest to point1
+        any_hit      - only if the segment has collision points or not, points are not computed
+"""
+
+import math
+from array import array
+
+from stages import stage
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+NAN = float('nan')
+
+QUERY_MODES = ('all', 'ray', 'segment_only', 'first_hit', 'any_hit')
+
+# numpy computes batches of at least NUMPY_MIN_RECORDS records as whole-array operations,
+# smaller batches and installations without numpy use the loops over array columns
+USE_NUMPY = numpy is not None
+NUMPY_MIN_RECORDS = 32
+
+
+def line_to_row(line) -> tuple:
+    """ Function converts Line object to row (x1, y1, z1, x2, y2, z2) """
+
+    point1 = line.point1
+    point2 = line.point2
+    return (point1.x, point1.y, point1.z, point2.x, point2.y, point2.z)
+
+def sphere_to_row(sphere) -> tuple:
+    """ Function converts Sphere object to row (cx, cy, cz, radius) """
+
+    center = sphere.center
+    return (center.x, center.y, center.z, sphere.radius)
+
+def _columns(records, to_row, size:int) -> tuple:
+
+    if hasattr(records, 'columns'):
+        return records.columns()
+
+    records = list(records)
+    if records and not hasattr(records[0], '__len__'):
+        records = [to_row(record) for record in records]
+
+    columns = tuple(zip(*records))
+    return columns if columns else ((),) * size
+
+def line_columns(lines) -> tuple:
+    """ Function converts lines to six columns
+
+        lines can be LineArray, sequence of Line objects or sequence of rows (x1, y1, z1, x2, y2, z2)
+    """
+
+    return _columns(lines, line_to_row, 6)
+
+def sphere_columns(spheres) -> tuple:
+    """ Function converts spheres to four columns
+
+        spheres can be SphereArray, sequence of Sphere objects or sequence of rows (cx, cy, cz, radius)
+    """
+
+    return _columns(spheres, sphere_to_row, 4)
+
+def get_quadratic_equation_coefficients_batch(lines:tuple, spheres:tuple) -> tuple:
+    """ Function gets line and sphere columns of the same length and returns arrays a, b, c """
+
+    a_values = array('d')
+    b_values = array('d')
+    c_values = array('d')
+    add_a = a_values.append
+    add_b = b_values.append
+    add_c = c_values.append
+
+    for x1, y1, z1, x2, y2, z2, cx, cy, cz, r in zip(*lines, *spheres):
+        dx = x2 - x1
+        dy = y2 - y1
+        dz = z2 - z1
+
+        add_a(dx ** 2 + dy ** 2 + dz ** 2)
+        add_b(2 * ((x1 - cx) * dx + (y1 - cy) * dy + (z1 - cz) * dz))
+        add_c((x1 - cx) ** 2 + (y1 - cy) ** 2 + (z1 - cz) ** 2 - r ** 2)
+
+    return a_values, b_values, c_values
+
+def solve_quadratic_equation_batch(a_values, b_values, c_values) -> tuple:
+    """ Function solves quadratic equations for arrays of coefficients
+
+        return hits, t1, t2 where hits is the number of roots of every equation
+    """
+
+    hits = bytearray(len(a_values))
+    t1_values = array('d', [NAN]) * len(a_values)
+    t2_values = array('d', [NAN]) * len(a_values)
+
+    for i, (a, b, c) in enumerate(zip(a_values, b_values, c_values)):
+        desc = b ** 2 - 4 * a * c
+
+        if desc < 0 or a == 0:
+            continue
+
+        if desc == 0:
+            hits[i] = 1
+            t1_values[i] = -b / (2 * a)
+            continue
+
+        hits[i] = 2
+        t1_values[i] = (-b - desc ** 0.5) / (2 * a)
+        t2_values[i] = (-b + desc ** 0.5) / (2 * a)
+
+    return hits, t1_values, t2_values
+
+def solve_quadratic_equation_stable_batch(a_values, b_values, c_values, eps:float=0.0) -> tuple:
+    """ Function solves quadratic equations for arrays of coefficients with the citardauq formula
+
+        works as solve_quadratic_equation_stable of sphere_line_collision.py, return hits, t1, t2
+    """
+
+    hits = bytearray(len(a_values))
+    t1_values = array('d', [NAN]) * len(a_values)
+    t2_values = array('d', [NAN]) * len(a_values)
+    sqrt = math.sqrt
+    copysign = math.copysign
+
+    for i, (a, b, c) in enumerate(zip(a_values, b_values, c_values)):
+        if a == 0:
+            continue
+
+        b2 = b * b
+        ac4 = 4 * a * c
+        desc = b2 - ac4
+        tolerance = eps * (b2 + abs(ac4))
+
+        if desc < -tolerance:
+            continue
+
+        if desc <= tolerance:
+            hits[i] = 1
+            t1_values[i] = -b / (2 * a)
+            continue
+
+        q = -0.5 * (b + copysign(sqrt(desc), b))
+        t1 = q / a
+        t2 = c / q
+
+        hits[i] = 2
+        if t1 <= t2:
+            t1_values[i] = t1
+            t2_values[i] = t2
+        else:
+            t1_values[i] = t2
+            t2_values[i] = t1
+
+    return hits, t1_values, t2_values
+
+def filter_roots_batch(hits, t1_values, t2_values, mode:str):
+    """ Function keeps only roots with 0 <= t <= 1 in place (0 <= t in ray mode),
+        for first_hit and any_hit modes only the smallest one
+    """
+
+    t_max = math.inf if mode == 'ray' else 1
+    single = mode in ('first_hit', 'any_hit')
+
+    for i, count in enumerate(hits):
+        if not count:
+            continue
+
+        roots = [t for t in (t1_values[i], t2_values[i])[:count] if 0 <= t <= t_max]
+        if single:
+            del roots[1:]
+
+        hits[i] = len(roots)
+        t1_values[i] = roots[0] if roots else NAN
+        t2_values[i] = roots[1] if len(roots) == 2 else NAN
+
+def find_collision_points_batch(lines:tuple, hits, t1_values, t2_values) -> tuple:
+    """ Function returns arrays with the first and the second collision points of every line """
+
+    first = array('d', [NAN]) * (3 * len(hits))
+    second = array('d', [NAN]) * (3 * len(hits))
+
+    for i, (x1, y1, z1, x2, y2, z2, count, t1, t2) in enumerate(zip(*lines, hits, t1_values, t2_values)):
+        if not count:
+            continue
+
+        dx = x2 - x1
+        dy = y2 - y1
+        dz = z2 - z1
+        j = 3 * i
+
+        first[j] = x1 + t1 * dx
+        first[j + 1] = y1 + t1 * dy
+        first[j + 2] = z1 + t1 * dz
+
+        if count == 2:
+            second[j] = x1 + t2 * dx
+            second[j + 1] = y1 + t2 * dy
+            second[j + 2] = z1 + t2 * dz
+
+    return first, second
+
+def _use_numpy(size:int) -> bool:
+
+    return USE_NUMPY and size >= NUMPY_MIN_RECORDS
+
+def _numpy_columns(columns) -> list:
+
+    return [numpy.asarray(column, dtype=numpy.float64) for column in columns]
+
+def _to_array(values) -> array:
+    """ Function copies numpy array of floats to array('d') """
+
+    result = array('d')
+    result.frombytes(numpy.ascontiguousarray(values, dtype=numpy.float64).tobytes())
+    return result
+
+def find_roots_numpy(lines:list, spheres:list, solver:str='classic', eps:float=0.0) -> tuple:
+    """ Function returns hits, t1, t2 of the infinite lines as numpy arrays, t1 <= t2
+
+        lines and spheres are lists of numpy columns, the formulas are the same as in the loops
+        of find_roots_batch, squares and roots are rounded once by numpy instead of by pow(),
+        so roots may differ in the last bits and discriminants of tangent lines from zero
+    """
+
+    x1, y1, z1, x2, y2, z2 = lines
+    cx, cy, cz, r = spheres
+
+    dx = x2 - x1
+    dy = y2 - y1
+    dz = z2 - z1
+    wx = x1 - cx
+    wy = y1 - cy
+    wz = z1 - cz
+
+    a = dx ** 2 + dy ** 2 + dz ** 2
+    b = 2 * (wx * dx + wy * dy + wz * dz)
+    c = wx ** 2 + wy ** 2 + wz ** 2 - r ** 2
+
+    hits = numpy.zeros(len(a), dtype=numpy.uint8)
+    t1_values = numpy.full(len(a), NAN)
+    t2_values = numpy.full(len(a), NAN)
+
+    with numpy.errstate(all='ignore'):
+        if solver == 'stable':
+            b2 = b * b
+            ac4 = 4 * a * c
+            desc = b2 - ac4
+            tolerance = eps * (b2 + numpy.abs(ac4))
+
+            solved = (a != 0) & ~(desc < -tolerance)
+            one = solved & (desc <= tolerance)
+            two = solved & ~one
+
+            t1_values[one] = -b[one] / (2 * a[one])
+
+            a, b, c, desc = a[two], b[two], c[two], desc[two]
+            q = -0.5 * (b + numpy.copysign(numpy.sqrt(desc), b))
+            t1 = q / a
+            t2 = c / q
+            ordered = t1 <= t2
+            t1_values[two] = numpy.where(ordered, t1, t2)
+            t2_values[two] = numpy.where(ordered, t2, t1)
+        else:
+            desc = b ** 2 - 4 * a * c
+
+            solved = ~((desc < 0) | (a == 0))
+            one = solved & (desc == 0)
+            two = solved & ~one
+
+            t1_values[one] = -b[one] / (2 * a[one])
+
+            a, b = a[two], b[two]
+            root = numpy.sqrt(desc[two])
+            t1_values[two] = (-b - root) / (2 * a)
+            t2_values[two] = (-b + root) / (2 * a)
+
+    hits[one] = 1
+    hits[two] = 2
+
+    return hits, t1_values, t2_values
+
+def get_collision_points_numpy(lines:list, hits, t1_values, t2_values, mode:str='all') -> tuple:
+    """ Function works as get_collision_points_batch for numpy arrays, return new arrays hits, first, second """
+
+    if mode != 'all':
+        t_max = math.inf if mode == 'ray' else 1
+        first_kept = (hits >= 1) & (0 <= t1_values) & (t1_values <= t_max)
+        second_kept = (hits == 2) & (0 <= t2_values) & (t2_values <= t_max)
+        if mode in ('first_hit', 'any_hit'):
+            second_kept &= ~first_kept
+
+        t1_values, t2_values = (numpy.where(first_kept, t1_values, numpy.where(second_kept, t2_values, NAN)),
+                                numpy.where(first_kept & second_kept, t2_values, NAN))
+        hits = first_kept.astype(numpy.uint8) + second_kept
+
+    size = len(hits)
+    if mode == 'any_hit':
+        return hits, numpy.full(3 * size, NAN), numpy.full(3 * size, NAN)
+
+    x1, y1, z1, x2, y2, z2 = lines
+    dx = x2 - x1
+    dy = y2 - y1
+    dz = z2 - z1
+
+    points = []
+    for t_values, count in ((t1_values, 1), (t2_values, 2)):
+        found = hits >= count
+        point = numpy.full((size, 3), NAN)
+        t_values = t_values[found]
+        point[found, 0] = x1[found] + t_values * dx[found]
+        point[found, 1] = y1[found] + t_values * dy[found]
+        point[found, 2] = z1[found] + t_values * dz[found]
+        points.append(point.ravel())
+
+    return hits, points[0], points[1]
+
+def solve_columns_numpy(lines:tuple, spheres:tuple, solver:str='classic', eps:float=0.0, mode:str='all') -> tuple:
+    """ Function works as solve_columns with whole-array numpy operations
+
+        return hits, first, second as bytearray and arrays of floats like solve_columns
+    """
+
+    lines = _numpy_columns(lines)
+    hits, t1_values, t2_values = find_roots_numpy(lines, _numpy_columns(spheres), solver, eps)
+    hits, first, second = get_collision_points_numpy(lines, hits, t1_values, t2_values, mode)
+
+    return bytearray(hits.tobytes()), _to_array(first), _to_array(second)
+
+def solve_columns(lines:tuple, spheres:tuple, solver:str='classic', eps:float=0.0, mode:str='all') -> tuple:
+    """ Function finds collisions of line and sphere columns of the same length
+
+        solver is 'classic' or 'stable', eps is the tangency tolerance of the stable solver,
+        mode is one of QUERY_MODES, points are nan in any_hit mode
+
+        return hits, first, second
+    """
+
+    if _use_numpy(len(lines[0])):
+        return solve_columns_numpy(lines, spheres, solver, eps, mode)
+
+    hits, t1_values, t2_values = find_roots_batch(lines, spheres, solver, eps)
+
+    return get_collision_points_batch(lines, hits, t1_values, t2_values, mode)
+
+def find_roots_batch(lines:tuple, spheres:tuple, solver:str='classic', eps:float=0.0) -> tuple:
+    """ Function returns hits, t1, t2 of the infinite lines, t1 <= t2 """
+
+    if _use_numpy(len(lines[0])):
+        hits, t1_values, t2_values = find_roots_numpy(_numpy_columns(lines), _numpy_columns(spheres), solver, eps)
+        return bytearray(hits.tobytes()), _to_array(t1_values), _to_array(t2_values)
+
+    a_values, b_values, c_values = get_quadratic_equation_coefficients_batch(lines, spheres)
+
+    if solver == 'stable':
+        return solve_quadratic_equation_stable_batch(a_values, b_values, c_values, eps)
+    return solve_quadratic_equation_batch(a_values, b_values, c_values)
+
+def get_collision_points_batch(lines:tuple, hits, t1_values, t2_values, mode:str='all') -> tuple:
+    """ Function filters roots t1 <= t2 of the infinite lines by the mode and returns hits, first, second """
+
+    if _use_numpy(len(hits)):
+        hits, first, second = get_collision_points_numpy(_numpy_columns(lines), numpy.frombuffer(hits, dtype=numpy.uint8),
+                                                         numpy.asarray(t1_values), numpy.asarray(t2_values), mode)
+        return bytearray(hits.tobytes()), _to_array(first), _to_array(second)
+
+    if mode != 'all':
+        filter_roots_batch(hits, t1_values, t2_values, mode)
+
+    if mode == 'any_hit':
+        first = array('d', [NAN]) * (3 * len(hits))
+        second = array('d', [NAN]) * (3 * len(hits))
+    else:
+        first, second = find_collision_points_batch(lines, hits, t1_values, t2_values)
+
+    return hits, first, second
+
+def find_sphere_line_collision_batch(lines, spheres, solver:str='classic', eps:float=0.0, mode:str='all') -> tuple:
+    """ Function finds collisions of lines[i] with spheres[i] for every i
+
+        return hits, first, second
+    """
+
+    if len(lines) != len(spheres):
+        raise ValueError('The number of lines and spheres must be equal')
+
+    return solve_columns(line_columns(lines), sphere_columns(spheres), solver, eps, mode)
+
+def find_sphere_line_collision_texts(lines, spheres, solver:str='classic', eps:float=0.0, mode:str='all') -> list:
+    """ Function finds collisions of lines[i] with spheres[i] for every i
+
+        return list of results in the same format as find_sphere_line_collision
+    """
+
+    if len(lines) != len(spheres):
+        raise ValueError('The number of lines and spheres must be equal')
+
+    with stage('construct'):
+        lines = line_columns(lines)
+        spheres = sphere_columns(spheres)
+
+    with stage('solve'):
+        hits, first, second = solve_columns(lines, spheres, solver, eps, mode)
+
+    with stage('format'):
+        return format_collision_batch(hits, first, second, mode)
+
+def find_sphere_line_collision_cross(lines, spheres, solver:str='classic', eps:float=0.0, mode:str='all') -> tuple:
+    """ Function finds collisions of every line with every sphere
+
+        the result of lines[i] and spheres[j] has index i * len(spheres) + j
+    """
+
+    lines_number = len(lines)
+    spheres_number = len(spheres)
+
+    lines = tuple([value for value in column for _ in range(spheres_number)] for column in line_columns(lines))
+    spheres = tuple(list(column) * lines_number for column in sphere_columns(spheres))
+
+    return solve_columns(lines, spheres, solver, eps, mode)
+
+def format_collision(hits, first, second, i:int, mode:str='all') -> str:
+    """ Function returns the result of record i in the same format as find_sphere_line_collision """
+
+    count = hits[i]
+
+    if mode == 'any_hit':
+        return 'Collision detected' if count else 'No collision detected'
+    j = 3 * i
+
+    if count == 1:
+        return f'\n{first[j]}, {first[j + 1]}, {first[j + 2]}\n'
+
+    if count == 2:
+        return (f'\n{first[j]}, {first[j + 1]}, {first[j + 2]}\n'
+                f'\n{second[j]}, {second[j + 1]}, {second[j + 2]}\n')
+
+    return 'No collision detected'
+
+def format_collision_batch(hits, first, second, mode:str='all') -> list:
+    """ Function returns results of all records in the same format as find_sphere_line_collision """
+
+    return [format_collision(hits, first, second, i, mode) for i in range(len(hits))]
@@ -0,0 +1,138 @@
+""" Binary files of collision jobs.
+
+    Records file: 8 bytes header RECORDS_MAGIC, then records of 10 little-endian float64 values
+
+        cx, cy, cz, radius, x1, y1, z1, x2, y2, z2
+
+    Results file: 8 bytes header RESULTS_MAGIC, then results of 7 little-endian float64 values
+
+        hits, x, y, z of the first collision point, x, y, z of the second collision point
+
+    where hits is 0, 1 or 2 and coordinates of missing points are nan.
+
+    Records files are read through mmap, so no text is parsed and only the chunk
+    which is being solved is copied to memory.
+"""
+
+import mmap
+import sys
+from array import array
+
+from batch import format_collision, solve_columns
+
+RECORDS_MAGIC = b'SLCREC\x00\x01'
+RESULTS_MAGIC = b'SLCRES\x00\x01'
+HEADER_SIZE = 8
+
+RECORD_SIZE = 10
+RESULT_SIZE = 7
+
+CHUNK_RECORDS = 1 << 16
+
+BIG_ENDIAN = sys.byteorder == 'big'
+
+
+def is_records_file(file_name:str) -> bool:
+    """ Function checks if the file starts with the header of records file """
+
+    with open(file_name, 'rb') as source_file:
+        return source_file.read(HEADER_SIZE) == RECORDS_MAGIC
+
+def _to_file_order(values:array) -> array:
+    """ Function swaps bytes of float64 values on big-endian machines, the files are little-endian """
+
+    if BIG_ENDIAN:
+        values = array('d', values)
+        values.byteswap()
+    return values
+
+def write_records(records_file, rows):
+    """ Function writes rows (cx, cy, cz, radius, x1, y1, z1, x2, y2, z2) to the opened records file """
+
+    _to_file_order(array('d', (value for row in rows for value in row))).tofile(records_file)
+
+def read_records(file_name:str, chunk_records:int=CHUNK_RECORDS):
+    """ Function reads the records file by chunks
+
+        yield tuple of 10 columns (cx, cy, cz, radius, x1, y1, z1, x2, y2, z2) for every chunk
+    """
+
+    with open(file_name, 'rb') as source_file:
+        if source_file.read(HEADER_SIZE) != RECORDS_MAGIC:
+            raise ValueError(f'{file_name} is not a records file')
+
+        size = source_file.seek(0, 2)
+        if (size - HEADER_SIZE) % (8 * RECORD_SIZE):
+            raise ValueError(f'{file_name} has incomplete record')
+        if size == HEADER_SIZE:
+            return
+
+        with mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            step = 8 * RECORD_SIZE * chunk_records
+            for start in range(HEADER_SIZE, size, step):
+                chunk = array('d')
+                chunk.frombytes(data[start:start + step])
+                chunk = _to_file_order(chunk)
+                yield tuple(chunk[k::RECORD_SIZE] for k in range(RECORD_SIZE))
+
+def solve_records(columns:tuple, solver:str='classic', eps:float=0.0, mode:str='all') -> tuple:
+    """ Function solves a chunk of records columns, return hits, first, second """
+
+    return solve_columns(columns[4:], columns[:4], solver, eps, mode)
+
+def pack_results(hits, first, second) -> array:
+    """ Function interleaves results of the batch engine into results records """
+
+    results = array('d', bytes(8 * RESULT_SIZE * len(hits)))
+    results[0::RESULT_SIZE] = array('d', iter(hits))
+    for k in range(3):
+        results[1 + k::RESULT_SIZE] = first[k::3]
+        results[4 + k::RESULT_SIZE] = second[k::3]
+
+    return results
+
+def solve_binary_file(source_name:str, result_name:str, solver:str='classic', eps:float=0.0, mode:str='all') -> int:
+    """ Function solves the records file and writes results file, return the number of records """
+
+    records = 0
+
+    with open(result_name, 'wb') as result_file:
+        result_file.write(RESULTS_MAGIC)
+
+        for columns in read_records(source_name):
+            hits, first, second = solve_records(columns, solver, eps, mode)
+            _to_file_order(pack_results(hits, first, second)).tofile(result_file)
+            records += len(hits)
+
+    return records
+
+def read_results(file_name:str, chunk_records:int=CHUNK_RECORDS):
+    """ Function reads the results file by chunks, yield hits, first, second for every chunk """
+
+    with open(file_name, 'rb') as result_file:
+        if result_file.read(HEADER_SIZE) != RESULTS_MAGIC:
+            raise ValueError(f'{file_name} is not a results file')
+
+        while True:
+            chunk = array('d')
+            try:
+                chunk.fromfile(result_file, chunk_records * RESULT_SIZE)
+            except EOFError:
+                pass
+            if not chunk:
+                return
+
+            chunk = _to_file_order(chunk)
+            hits = bytearray(int(count) for count in chunk[0::RESULT_SIZE])
+            first = array('d', bytes(8 * 3 * len(hits)))
+            second = array('d', bytes(8 * 3 * len(hits)))
+            for k in range(3):
+                first[k::3] = chunk[1 + k::RESULT_SIZE]
+                second[k::3] = chunk[4 + k::RESULT_SIZE]
+
+            yield hits, first, second
+
+def format_results(hits, first, second, mode:str='all') -> str:
+    """ Function returns results of a chunk in the same format as the text mode """
+
+    return ''.join(f'{format_collision(hits, first, second, i, mode)}\n' for i in range(len(hits)))
@@ -0,0 +1,94 @@
+""" Cache of collision results for repeated records.
+
+    Records are keyed by the bytes of their ten float64 values, so equal records hit the cache
+    and records which differ only in the sign of zero are kept apart.
+"""
+
+import struct
+from collections import OrderedDict
+
+RECORD_KEY = struct.Struct('<10d')
+
+
+class LRUCache:
+    """ Dictionary with at most maxsize items, the least recently used item is removed first """
+
+    def __init__(self, maxsize:int):
+        if maxsize < 1:
+            raise ValueError('The cache size must be positive')
+
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, key):
+        """ Function returns the value of the key or None and counts hits and misses """
+
+        value = self.items.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+
+        self.items[key] = value
+        self.items.move_to_end(key)
+        if len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class CachedSolver:
+    """ Wrapper of solve function of the streaming mode, it solves only records which are not in the cache
+
+        solve gets lists of line and sphere rows and returns list of collision texts
+    """
+
+    def __init__(self, solve, maxsize:int):
+        self.solve = solve
+        self.cache = LRUCache(maxsize)
+
+    def __call__(self, lines_rows:list, spheres_rows:list) -> list:
+
+        cache = self.cache
+        pack = RECORD_KEY.pack
+        texts = [None] * len(lines_rows)
+        pending = {}
+
+        for i, (line, sphere) in enumerate(zip(lines_rows, spheres_rows)):
+            key = pack(*sphere, *line)
+            text = cache.get(key)
+            if text is not None:
+                texts[i] = text
+            elif key in pending:
+                pending[key].append(i)
+            else:
+                pending[key] = [i]
+
+        if pending:
+            first = [indexes[0] for indexes in pending.values()]
+            solved = self.solve([lines_rows[i] for i in first], [spheres_rows[i] for i in first])
+
+            for (key, indexes), text in zip(pending.items(), solved):
+                cache.put(key, text)
+                for i in indexes:
+                    texts[i] = text
+
+            # repeated records of the same batch are solved once, so they are hits
+            repeated = sum(len(indexes) - 1 for indexes in pending.values())
+            cache.misses -= repeated
+            cache.hits += repeated
+
+        return texts
@@ -0,0 +1,310 @@
+""" Collisions of lines with several types of primitives.
+
+    Every primitive type is registered in PRIMITIVES with the names of its fields and a kernel.
+    A kernel gets six line columns and the columns of the primitives (struct of arrays, see batch.py)
+    and returns hits, t1, t2 of the infinite lines, t1 <= t2. Kernels of quadratic primitives (spheres
+    and capsules) get also the solver and eps of sphere_line_collision.py, their tangent lines get one
+    point with the stable solver and eps > 0. Query modes, collision points and the text format
+    are shared by all primitives, so the results look like results of spheres.
+
+    Registered primitives:
+
+        sphere  - cx, cy, cz, radius
+        plane   - px, py, pz, nx, ny, nz: a point of the plane and its normal
+        box     - min_x, min_y, min_z, max_x, max_y, max_z: axis-aligned box
+        capsule - ax, ay, az, bx, by, bz, radius: points within radius from the segment a-b
+
+    Lines hit the surface of a primitive, so a line crossing a box or a capsule has the entry and the exit
+    points and a line touching it has one point. A line with equal points and a line lying in a plane are
+    reported as having no collision.
+
+    find_primitive_collisions solves a scene with mixed primitive types: records are grouped by type and
+    every kernel runs once over the columns of its group.
+"""
+
+import functools
+import math
+from array import array
+
+from batch import NAN, QUERY_MODES, find_roots_batch, get_collision_points_batch, line_columns
+from sphere_line_collision import solve_quadratic_equation, solve_quadratic_equation_stable
+
+PRIMITIVES = {}
+
+
+class Primitive:
+
+    __slots__ = ('name', 'fields', 'kernel', 'quadratic')
+
+    def __init__(self, name:str, fields:tuple, kernel, quadratic:bool=False):
+        self.name = name
+        self.fields = fields
+        self.kernel = kernel
+        self.quadratic = quadratic
+
+    def columns(self, shapes) -> tuple:
+        """ Function converts rows of the primitives to columns, objects with columns() are passed as they are """
+
+        if hasattr(shapes, 'columns'):
+            return shapes.columns()
+
+        columns = tuple(zip(*shapes))
+        if columns and len(columns) != len(self.fields):
+            raise ValueError(f'{self.name} must have {len(self.fields)} values: {", ".join(self.fields)}')
+        return columns if columns else ((),) * len(self.fields)
+
+
+def register_primitive(name:str, fields:tuple, kernel, quadratic:bool=False):
+    """ Function adds the primitive type, kernel(lines, shapes) returns hits, t1, t2,
+        kernels of quadratic primitives are called as kernel(lines, shapes, solver, eps)
+    """
+
+    PRIMITIVES[name] = Primitive(name, tuple(fields), kernel, quadratic)
+
+def get_primitive(name:str) -> Primitive:
+
+    try:
+        return PRIMITIVES[name]
+    except KeyError:
+        raise ValueError(f'Unknown primitive {name}, expected one of: {", ".join(PRIMITIVES)}') from None
+
+def _empty_roots(size:int) -> tuple:
+
+    return bytearray(size), array('d', [NAN]) * size, array('d', [NAN]) * size
+
+def sphere_kernel(lines:tuple, spheres:tuple, solver:str='classic', eps:float=0.0) -> tuple:
+    """ Kernel of spheres, it is the batch engine of sphere_line_collision.py """
+
+    return find_roots_batch(lines, spheres, solver, eps)
+
+def plane_kernel(lines:tuple, planes:tuple) -> tuple:
+    """ Kernel of planes, t = n * (p - p1) / n * d """
+
+    hits, t1_values, t2_values = _empty_roots(len(lines[0]))
+
+    for i, (x1, y1, z1, x2, y2, z2, px, py, pz, nx, ny, nz) in enumerate(zip(*lines, *planes)):
+        denominator = nx * (x2 - x1) + ny * (y2 - y1) + nz * (z2 - z1)
+        if denominator == 0:
+            continue
+
+        hits[i] = 1
+        t1_values[i] = (nx * (px - x1) + ny * (py - y1) + nz * (pz - z1)) / denominator
+
+    return hits, t1_values, t2_values
+
+def box_kernel(lines:tuple, boxes:tuple) -> tuple:
+    """ Kernel of axis-aligned boxes, the slab test gives the entry and the exit of the line """
+
+    hits, t1_values, t2_values = _empty_roots(len(lines[0]))
+    inf = math.inf
+
+    for i, (x1, y1, z1, x2, y2, z2, *box) in enumerate(zip(*lines, *boxes)):
+        origin = (x1, y1, z1)
+        direction = (x2 - x1, y2 - y1, z2 - z1)
+        if direction == (0, 0, 0):
+            continue
+
+        t_near = -inf
+        t_far = inf
+        for k in range(3):
+            o = origin[k]
+            d = direction[k]
+            low = box[k]
+            high = box[k + 3]
+
+            if d == 0:
+                if o < low or o > high:
+                    break
+                continue
+
+            t0 = (low - o) / d
+            t1 = (high - o) / d
+            if t0 > t1:
+                t0, t1 = t1, t0
+            if t0 > t_near:
+                t_near = t0
+            if t1 < t_far:
+                t_far = t1
+            if t_near > t_far:
+                break
+        else:
+            t1_values[i] = t_near
+            if t_near == t_far:
+                hits[i] = 1
+            else:
+                hits[i] = 2
+                t2_values[i] = t_far
+
+    return hits, t1_values, t2_values
+
+def _solve_interval(a:float, b:float, c:float, solve):
+    """ Function returns (t_in, t_out) where a * t ** 2 + b * t + c <= 0 for a > 0 or None """
+
+    roots = solve(a, b, c)
+    return (roots[0], roots[-1]) if roots else None
+
+def _sphere_interval(wx:float, wy:float, wz:float, dx:float, dy:float, dz:float, dd:float, r:float, solve):
+    """ Function returns (t_in, t_out) of the line w + t * d in the sphere of radius r at the origin or None """
+
+    b = 2 * (wx * dx + wy * dy + wz * dz)
+    c = wx ** 2 + wy ** 2 + wz ** 2 - r ** 2
+    return _solve_interval(dd, b, c, solve)
+
+def _cylinder_interval(wx:float, wy:float, wz:float, dx:float, dy:float, dz:float,
+                       ux:float, uy:float, uz:float, uu:float, r:float, solve):
+    """ Function returns (t_in, t_out) of the line w + t * d in the cylinder of radius r
+        around the segment from the origin to u or None
+    """
+
+    wu = (wx * ux + wy * uy + wz * uz) / uu
+    du = (dx * ux + dy * uy + dz * uz) / uu
+
+    # the axial coordinate wu + t * du must be between 0 and 1
+    if du == 0:
+        if wu < 0 or wu > 1:
+            return None
+        t_low, t_high = -math.inf, math.inf
+    else:
+        t_low, t_high = sorted((-wu / du, (1 - wu) / du))
+
+    # components perpendicular to the axis
+    px = wx - wu * ux
+    py = wy - wu * uy
+    pz = wz - wu * uz
+    qx = dx - du * ux
+    qy = dy - du * uy
+    qz = dz - du * uz
+
+    a = qx ** 2 + qy ** 2 + qz ** 2
+    c = px ** 2 + py ** 2 + pz ** 2 - r ** 2
+    if a == 0:
+        if c > 0:
+            return None
+        t_in, t_out = -math.inf, math.inf
+    else:
+        interval = _solve_interval(a, 2 * (px * qx + py * qy + pz * qz), c, solve)
+        if interval is None:
+            return None
+        t_in, t_out = interval
+
+    t_in = max(t_in, t_low)
+    t_out = min(t_out, t_high)
+    return (t_in, t_out) if t_in <= t_out else None
+
+def capsule_kernel(lines:tuple, capsules:tuple, solver:str='classic', eps:float=0.0) -> tuple:
+    """ Kernel of capsules
+
+        a capsule is the union of the spheres at its ends and the cylinder between them,
+        it is convex, so the line crosses it in the single interval joining the intervals of the parts,
+        the quadratic equations of the parts are solved by the solver with eps
+    """
+
+    hits, t1_values, t2_values = _empty_roots(len(lines[0]))
+    if solver == 'stable':
+        solve = functools.partial(solve_quadratic_equation_stable, eps=eps)
+    else:
+        solve = solve_quadratic_equation
+
+    for i, (x1, y1, z1, x2, y2, z2, ax, ay, az, bx, by, bz, r) in enumerate(zip(*lines, *capsules)):
+        dx = x2 - x1
+        dy = y2 - y1
+        dz = z2 - z1
+        dd = dx ** 2 + dy ** 2 + dz ** 2
+        if dd == 0:
+            continue
+
+        ux = bx - ax
+        uy = by - ay
+        uz = bz - az
+        uu = ux ** 2 + uy ** 2 + uz ** 2
+        wx = x1 - ax
+        wy = y1 - ay
+        wz = z1 - az
+
+        intervals = [_sphere_interval(wx, wy, wz, dx, dy, dz, dd, r, solve),
+                     _sphere_interval(x1 - bx, y1 - by, z1 - bz, dx, dy, dz, dd, r, solve)]
+        if uu:
+            intervals.append(_cylinder_interval(wx, wy, wz, dx, dy, dz, ux, uy, uz, uu, r, solve))
+
+        intervals = [interval for interval in intervals if interval is not None]
+        if not intervals:
+            continue
+
+        t_in = min(t for t, _ in intervals)
+        t_out = max(t for _, t in intervals)
+        t1_values[i] = t_in
+        if t_in == t_out:
+            hits[i] = 1
+        else:
+            hits[i] = 2
+            t2_values[i] = t_out
+
+    return hits, t1_values, t2_values
+
+register_primitive('sphere', ('cx', 'cy', 'cz', 'radius'), sphere_kernel, quadratic=True)
+register_primitive('plane', ('px', 'py', 'pz', 'nx', 'ny', 'nz'), plane_kernel)
+register_primitive('box', ('min_x', 'min_y', 'min_z', 'max_x', 'max_y', 'max_z'), box_kernel)
+register_primitive('capsule', ('ax', 'ay', 'az', 'bx', 'by', 'bz', 'radius'), capsule_kernel, quadratic=True)
+
+def solve_primitive_columns(kind:str, lines:tuple, shapes:tuple, solver:str='classic', eps:float=0.0,
+                            mode:str='all') -> tuple:
+    """ Function finds collisions of line columns with primitive columns of the same length
+
+        solver and eps are used by quadratic primitives only,
+        mode is one of QUERY_MODES, return hits, first, second as solve_columns of batch.py
+    """
+
+    if mode not in QUERY_MODES:
+        raise ValueError(f'Unknown mode {mode}, expected one of: {", ".join(QUERY_MODES)}')
+
+    primitive = get_primitive(kind)
+    if primitive.quadratic:
+        hits, t1_values, t2_values = primitive.kernel(lines, shapes, solver, eps)
+    else:
+        hits, t1_values, t2_values = primitive.kernel(lines, shapes)
+
+    return get_collision_points_batch(lines, hits, t1_values, t2_values, mode)
+
+def find_primitive_collision_batch(kind:str, lines, shapes, solver:str='classic', eps:float=0.0,
+                                   mode:str='all') -> tuple:
+    """ Function finds collisions of lines[i] with primitives shapes[i] of the same type for every i
+
+        return hits, first, second
+    """
+
+    if len(lines) != len(shapes):
+        raise ValueError('The number of lines and primitives must be equal')
+
+    return solve_primitive_columns(kind, line_columns(lines), get_primitive(kind).columns(shapes), solver, eps, mode)
+
+def find_primitive_collisions(lines, shapes, solver:str='classic', eps:float=0.0, mode:str='all') -> tuple:
+    """ Function finds collisions of lines[i] with shapes[i] for every i, shapes are (kind, row) pairs
+        of any registered types
+
+        return hits, first, second in the order of the records
+    """
+
+    if len(lines) != len(shapes):
+        raise ValueError('The number of lines and primitives must be equal')
+
+    lines = list(zip(*line_columns(lines)))
+    groups = {}
+    for i, (kind, row) in enumerate(shapes):
+        groups.setdefault(kind, []).append(i)
+
+    hits = bytearray(len(lines))
+    first = array('d', [NAN]) * (3 * len(lines))
+    second = array('d', [NAN]) * (3 * len(lines))
+
+    for kind, indexes in groups.items():
+        group_lines = tuple(zip(*(lines[i] for i in indexes)))
+        group_shapes = get_primitive(kind).columns([shapes[i][1] for i in indexes])
+        group_hits, group_first, group_second = solve_primitive_columns(kind, group_lines, group_shapes,
+                                                                        solver, eps, mode)
+
+        for k, i in enumerate(indexes):
+            hits[i] = group_hits[k]
+            first[3 * i:3 * i + 3] = group_first[3 * k:3 * k + 3]
+            second[3 * i:3 * i + 3] = group_second[3 * k:3 * k + 3]
+
+    return hits, first, second
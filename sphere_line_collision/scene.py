@@ -0,0 +1,202 @@
+""" Collisions of many lines with many spheres.
+
+    Spheres of the scene are put into a bounding volume hierarchy (BVH) of their bounding boxes.
+    Every line is checked only against the spheres whose boxes it crosses, and these candidate
+    pairs are solved by the batch engine, so the result is the same as checking every pair.
+
+    Lines and spheres are rows in the same format as in batch.py:
+
+        lines   - (x1, y1, z1, x2, y2, z2) for every line
+        spheres - (cx, cy, cz, radius) for every sphere
+
+    LineArray and SphereArray objects or sequences of Line and Sphere objects are accepted as well.
+
+    The stable solver with eps > 0 reports lines passing a little outside a sphere as tangent,
+    so boxes are widened for every line by the largest distance at which it can still be tangent.
+"""
+
+import math
+
+from batch import (find_sphere_line_collision_batch, find_sphere_line_collision_cross, format_collision,
+                   line_columns, sphere_columns)
+
+LEAF_SIZE = 4
+
+# boxes are a little bigger than spheres, so rounding errors never drop a tangent line
+BOX_PADDING = 1e-7
+
+
+class SphereBVH:
+
+    def __init__(self, spheres):
+        self.spheres = list(spheres)
+        self.order = list(range(len(self.spheres)))
+
+        self.boxes = [self.__get_sphere_box(sphere) for sphere in self.spheres]
+
+        # nodes are kept in flat lists, a leaf has no children and keeps the range of self.order
+        self.node_boxes = []
+        self.children = []
+        self.ranges = []
+
+        if self.spheres:
+            self.__build(0, len(self.order))
+
+    @staticmethod
+    def __get_sphere_box(sphere) -> tuple:
+
+        cx, cy, cz, r = sphere
+        r = abs(r)
+        pad = BOX_PADDING * (r + max(abs(cx), abs(cy), abs(cz))) + BOX_PADDING
+        r += pad
+
+        return (cx - r, cy - r, cz - r, cx + r, cy + r, cz + r)
+
+    def __build(self, start:int, end:int) -> int:
+
+        boxes = self.boxes
+        indexes = self.order[start:end]
+        node_box = tuple(min(boxes[i][k] for i in indexes) for k in range(3)) + \
+                   tuple(max(boxes[i][k] for i in indexes) for k in range(3, 6))
+
+        node = len(self.node_boxes)
+        self.node_boxes.append(node_box)
+        self.children.append(None)
+        self.ranges.append((start, end))
+
+        if end - start <= LEAF_SIZE:
+            return node
+
+        axis = max(range(3), key=lambda k: node_box[k + 3] - node_box[k])
+        indexes.sort(key=lambda i: boxes[i][axis] + boxes[i][axis + 3])
+        self.order[start:end] = indexes
+
+        middle = (start + end) // 2
+        left = self.__build(start, middle)
+        right = self.__build(middle, end)
+        self.children[node] = (left, right)
+
+        return node
+
+    def query(self, line, segment:bool=False, pad:float=0.0) -> list:
+        """ Function returns indexes of spheres whose bounding boxes are crossed by the line
+
+            if segment is True only the part of the line between its points is checked,
+            boxes are widened by pad on every side
+        """
+
+        if not self.spheres:
+            return []
+
+        x1, y1, z1, x2, y2, z2 = line
+        origin = (x1, y1, z1)
+        direction = (x2 - x1, y2 - y1, z2 - z1)
+
+        t_range = (0.0, 1.0) if segment else (float('-inf'), float('inf'))
+        node_boxes = self.node_boxes
+        children = self.children
+        candidates = []
+        stack = [0]
+
+        while stack:
+            node = stack.pop()
+            box = node_boxes[node]
+            if pad:
+                box = (box[0] - pad, box[1] - pad, box[2] - pad, box[3] + pad, box[4] + pad, box[5] + pad)
+            if not is_line_crossing_box(origin, direction, box, *t_range):
+                continue
+
+            if children[node] is None:
+                start, end = self.ranges[node]
+                candidates.extend(self.order[start:end])
+            else:
+                stack.extend(children[node])
+
+        candidates.sort()
+        return candidates
+
+
+def is_line_crossing_box(origin:tuple, direction:tuple, box:tuple, t_min:float=float('-inf'), t_max:float=float('inf')) -> bool:
+    """ Function checks if the line origin + t * direction with t_min <= t <= t_max crosses
+        the box (min_x, min_y, min_z, max_x, max_y, max_z)
+    """
+
+    for k in range(3):
+        o = origin[k]
+        d = direction[k]
+        low = box[k]
+        high = box[k + 3]
+
+        if d == 0:
+            if o < low or o > high:
+                return False
+            continue
+
+        t0 = (low - o) / d
+        t1 = (high - o) / d
+        if t0 > t1:
+            t0, t1 = t1, t0
+
+        if t0 > t_min:
+            t_min = t0
+        if t1 < t_max:
+            t_max = t1
+        if t_min > t_max:
+            return False
+
+    return True
+
+def get_tolerance_pads(lines:list, spheres:list, eps:float) -> list:
+    """ Function returns for every line the distance outside of any sphere at which
+        the stable solver with eps can still report the line as tangent
+
+        the line is tangent if dist ** 2 - r ** 2 <= eps * ((w * d) ** 2 / (d * d) + |w * w - r ** 2|)
+        where dist is the distance of the center from the line and w = point1 - center,
+        the right side is at most eps * (2 * |w| ** 2 + r ** 2), so dist <= r + sqrt(eps * (2 * |w| ** 2 + r ** 2))
+    """
+
+    reach = max(math.sqrt(cx ** 2 + cy ** 2 + cz ** 2) for cx, cy, cz, _ in spheres)
+    radius = max(abs(r) for _, _, _, r in spheres)
+
+    pads = []
+    for x1, y1, z1, *_ in lines:
+        # |w| is not greater than the distance of point1 from the origin plus the farthest center
+        w = math.sqrt(x1 ** 2 + y1 ** 2 + z1 ** 2) + reach
+        pads.append(math.sqrt(eps * (2 * w ** 2 + radius ** 2)))
+    return pads
+
+def find_scene_collisions(lines, spheres, solver:str='classic', eps:float=0.0, mode:str='all') -> list:
+    """ Function finds collisions of every line with every sphere using SphereBVH
+
+        return sorted list of (line_index, sphere_index, collision_text) for pairs with collision points
+    """
+
+    lines = list(zip(*line_columns(lines)))
+    spheres = list(zip(*sphere_columns(spheres)))
+    bvh = SphereBVH(spheres)
+
+    # the classic solver and eps = 0 find only exact tangents, they are inside the padded boxes
+    if solver == 'stable' and eps > 0 and spheres:
+        pads = get_tolerance_pads(lines, spheres, eps)
+    else:
+        pads = [0.0] * len(lines)
+
+    # rays are checked against boxes as infinite lines, their candidates are filtered by the batch engine
+    segment = mode not in ('all', 'ray')
+    pairs = [(i, j) for i, line in enumerate(lines) for j in bvh.query(line, segment, pads[i])]
+    hits, first, second = find_sphere_line_collision_batch([lines[i] for i, _ in pairs], [spheres[j] for _, j in pairs],
+                                                           solver, eps, mode)
+
+    return [(i, j, format_collision(hits, first, second, k, mode)) for k, (i, j) in enumerate(pairs) if hits[k]]
+
+def find_scene_collisions_brute(lines, spheres, solver:str='classic', eps:float=0.0, mode:str='all') -> list:
+    """ Function finds collisions of every line with every sphere checking all pairs
+
+        return the same result as find_scene_collisions
+    """
+
+    hits, first, second = find_sphere_line_collision_cross(lines, spheres, solver, eps, mode)
+    spheres_number = len(spheres)
+
+    return [(k // spheres_number, k % spheres_number, format_collision(hits, first, second, k, mode))
+            for k in range(len(hits)) if hits[k]]
@@ -0,0 +1,303 @@
+""" Long-running collision service with a persistent worker pool.
+
+    To run the service enter one of
+
+        service.py --socket /tmp/collision.sock
+        service.py --port 8765
+        service.py --stdio
+
+    Clients send records in the same text format as the source files of sphere_line_collision.py,
+    one record per line. The service sends back one line for every not empty record line, in the
+    order of the records of the connection:
+
+        No collision detected
+        x, y, z                  - one collision point
+        x, y, z; x, y, z         - two collision points
+        Collision detected       - any_hit mode
+        String N: invalid data format
+
+    where N is the number of the line in the connection starting from 1. Lines longer than
+    MAX_LINE_LENGTH bytes get the invalid data format reply and are not kept in memory.
+
+    Records which arrive within --window milliseconds from all connections are solved together,
+    a batch is sent to the pool at once when it has --max-batch records. Worker processes are
+    started once, so small queries do not pay the interpreter startup and the --cache of every
+    worker stays warm between requests.
+"""
+
+import argparse
+import asyncio
+import functools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from batch import QUERY_MODES, find_sphere_line_collision_texts
+from cache import CachedSolver
+from sphere_line_collision import QUADRATIC_SOLVERS, solve_lines
+
+BATCH_WINDOW = 0.002
+MAX_BATCH = 4096
+READ_SIZE = 1 << 16
+# longer lines are answered as invalid without being kept in memory, records are about 100 bytes
+MAX_LINE_LENGTH = 1 << 16
+
+# solve function of the worker process, it is created once by init_worker
+_solve = None
+
+
+def init_worker(solver:str, eps:float, mode:str, cache:int):
+    """ Function creates the solve function of the worker process """
+
+    global _solve
+    _solve = functools.partial(find_sphere_line_collision_texts, solver=solver, eps=eps, mode=mode)
+    if cache:
+        _solve = CachedSolver(_solve, cache)
+
+def to_single_line(text:str) -> str:
+    """ Function joins collision points of the text into one line """
+
+    return '; '.join(part for part in text.split('\n') if part)
+
+def solve_requests(lines:list) -> list:
+    """ Function solves not empty record lines in the worker process
+
+        return one line for every record, None for records with invalid format
+    """
+
+    results = solve_lines(lines, _solve)[0]
+    return [None if isinstance(result, int) else to_single_line(result) for result in results]
+
+
+class Batcher:
+    """ Collector of record lines from all connections, it solves them on the pool in batches """
+
+    def __init__(self, pool, window:float=BATCH_WINDOW, max_batch:int=MAX_BATCH):
+        self.pool = pool
+        self.window = window
+        self.max_batch = max_batch
+
+        self.lines = []
+        self.groups = []
+        self.timer = None
+
+    def submit(self, lines:list) -> asyncio.Future:
+        """ Function adds record lines to the next batch, return future of their results """
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.groups.append((future, len(lines)))
+        self.lines.extend(lines)
+
+        if len(self.lines) >= self.max_batch:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.window, self.flush)
+
+        return future
+
+    def flush(self):
+
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.lines:
+            return
+
+        lines, groups = self.lines, self.groups
+        self.lines, self.groups = [], []
+
+        solved = asyncio.get_running_loop().run_in_executor(self.pool, solve_requests, lines)
+        solved.add_done_callback(functools.partial(self.__distribute, groups))
+
+    @staticmethod
+    def __distribute(groups:list, solved:asyncio.Future):
+
+        if solved.exception() is not None:
+            for future, _ in groups:
+                if not future.done():
+                    future.set_exception(solved.exception())
+            return
+
+        results = solved.result()
+        start = 0
+        for future, size in groups:
+            if not future.done():
+                future.set_result(results[start:start + size])
+            start += size
+
+
+async def read_requests(reader, batcher:Batcher, pending:asyncio.Queue):
+    """ Function reads record lines of the connection and submits them to the batcher
+
+        pending gets (line_numbers, future) for every submitted group and None at the end,
+        a line longer than MAX_LINE_LENGTH gets the invalid format result and the rest of it is skipped
+    """
+
+    tail = b''
+    line_number = 0
+    # the rest of a too long line is skipped up to its end
+    skipping = False
+
+    while True:
+        data = await reader.read(READ_SIZE)
+        if not data:
+            lines = [tail] if tail else []
+        else:
+            lines = (tail + data).split(b'\n')
+            tail = lines.pop()
+            if skipping and lines:
+                del lines[0]
+                skipping = False
+
+        numbers = []
+        records = []
+        for line in lines:
+            line_number += 1
+            line = line.decode(errors='replace')
+            if line.strip():
+                numbers.append(line_number)
+                records.append(line)
+
+        if records:
+            await pending.put((numbers, batcher.submit(records)))
+
+        if skipping:
+            tail = b''
+        elif len(tail) > MAX_LINE_LENGTH:
+            line_number += 1
+            invalid = asyncio.get_running_loop().create_future()
+            invalid.set_result([None])
+            await pending.put(([line_number], invalid))
+            tail = b''
+            skipping = True
+
+        if not data:
+            break
+
+    await pending.put(None)
+
+async def write_responses(write, drain, pending:asyncio.Queue):
+    """ Function writes results of the connection in the order of its records """
+
+    while True:
+        item = await pending.get()
+        if item is None:
+            return
+
+        numbers, future = item
+        results = await future
+        write(''.join(f'String {number}: invalid data format\n' if result is None else f'{result}\n'
+                      for number, result in zip(numbers, results)).encode())
+        await drain()
+
+async def serve_connection(reader, write, drain, batcher:Batcher):
+
+    # the queue bounds the number of groups which are read ahead of the written results
+    pending = asyncio.Queue(maxsize=64)
+    writer_task = asyncio.create_task(write_responses(write, drain, pending))
+    try:
+        await read_requests(reader, batcher, pending)
+        await writer_task
+    finally:
+        writer_task.cancel()
+
+async def handle_client(batcher:Batcher, reader, writer):
+
+    try:
+        await serve_connection(reader, writer.write, writer.drain, batcher)
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+class StdinReader:
+    """ Reader of stdin with the read method of asyncio streams, stdin is read in a thread,
+        so regular files work as well as pipes and terminals
+    """
+
+    def __init__(self):
+        self.source = sys.stdin.buffer
+
+    async def read(self, size:int) -> bytes:
+        return await asyncio.get_running_loop().run_in_executor(None, self.source.read1, size)
+
+
+async def serve_stdio(batcher:Batcher):
+    """ Function serves records from stdin and writes results to stdout until the end of stdin """
+
+    output = sys.stdout.buffer
+
+    async def drain():
+        output.flush()
+
+    await serve_connection(StdinReader(), output.write, drain, batcher)
+
+async def serve(arguments):
+
+    initargs = (arguments.solver, arguments.eps, arguments.mode, arguments.cache)
+    with ProcessPoolExecutor(arguments.workers, initializer=init_worker, initargs=initargs) as pool:
+        batcher = Batcher(pool, arguments.window / 1000, arguments.max_batch)
+
+        # workers are started before the first connection, so forked workers do not inherit client
+        # sockets which would stay open after the connection is closed
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(pool, os.getpid) for _ in range(arguments.workers)))
+
+        if arguments.stdio:
+            await serve_stdio(batcher)
+            return
+
+        handler = functools.partial(handle_client, batcher)
+        if arguments.socket:
+            server = await asyncio.start_unix_server(handler, path=arguments.socket)
+        else:
+            server = await asyncio.start_server(handler, host='127.0.0.1', port=arguments.port)
+
+        async with server:
+            print(f'Serving on {arguments.socket or arguments.port}', file=sys.stderr)
+            await server.serve_forever()
+
+def parse_arguments(arguments:list):
+
+    parser = argparse.ArgumentParser(description='Serve collision queries with a persistent worker pool.')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--socket', metavar='PATH', help='listen on the unix socket')
+    source.add_argument('--port', type=int, help='listen on the TCP port of 127.0.0.1')
+    source.add_argument('--stdio', action='store_true', help='read records from stdin and write results to stdout')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='number of worker processes')
+    parser.add_argument('--window', type=float, default=BATCH_WINDOW * 1000,
+                        help='milliseconds to wait for more records before a batch is solved')
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH, help='number of records which are solved at once')
+    parser.add_argument('--solver', choices=QUADRATIC_SOLVERS, default='classic',
+                        help="'classic' formula or numerically 'stable' citardauq formula")
+    parser.add_argument('--eps', type=float, default=0.0, help='relative tangency tolerance of the stable solver')
+    parser.add_argument('--mode', choices=QUERY_MODES, default='all',
+                        help="'all' points of the infinite line, 'ray' points from point1 on, "
+                             "'segment_only' points between point1 and point2, "
+                             "'first_hit' the nearest point of the segment or 'any_hit' yes/no answer")
+    parser.add_argument('--cache', type=int, default=0, metavar='SIZE',
+                        help='keep results of SIZE last distinct records in every worker')
+
+    return parser.parse_args(arguments)
+
+def main():
+
+    arguments = parse_arguments(sys.argv[1:])
+    try:
+        asyncio.run(serve(arguments))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if arguments.socket and os.path.exists(arguments.socket):
+            os.remove(arguments.socket)
+
+
+if __name__ == '__main__':
+
+    main()
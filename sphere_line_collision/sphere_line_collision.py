@@ -6,13 +6,65 @@
 
     {sphere: {center: [0, 0, 0], radius: 10.67}, line: {[1, 0.5, 15], [43, -14.6, 0.04]}} 
 
-    pay atention the placement of spaces inside objects.
+    Objects and keys can be placed in any order, whitespace characters between them are allowed.
+
+    Add '--stream' to process big files in chunks: results are solved in batches, malformed lines
+    are only counted and the processing speed is reported at the end.
+
+    Add '--workers N' to split the file into shards and solve them in N processes,
+    the output is the same as with '--stream'.
+
+    Add '--scene' to check every line of the file against every sphere of the file,
+    spheres are indexed by a bounding volume hierarchy, so only close spheres are solved.
+
+    Add '--solver stable' to use the numerically stable quadratic formula, '--eps' sets its tangency tolerance.
+
+    Add '--mode segment_only', '--mode first_hit' or '--mode any_hit' to treat the line as the segment
+    between its points and to find all its points, the nearest point or only if there is a collision,
+    '--mode ray' treats the line as the ray from point1 through point2.
+
+    Add '--cache SIZE' to reuse results of repeated records, the cache keeps SIZE last distinct records
+    (with '--workers' every worker process keeps its own cache for all its shards),
+    hits and misses of all caches are reported at the end.
+
+    Add '--profile' to print the time of parse, construct, solve, format and output stages at the end.
+
+    Add '--to-binary output_file' to convert the source file to binary records (see binary_format.py).
+    Binary records files are detected automatically, add '--output results_file' to write binary results.
+
+    To solve records sent over a socket or stdin by a long-running process see service.py.
 """
-    
-    
+
+import argparse
+import functools
+import io
+import math
+import operator
+import os
+import re
+import sys
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import binary_format
+import stages
+from batch import QUERY_MODES, find_sphere_line_collision_texts, line_to_row, sphere_to_row
+from cache import CachedSolver
+from scene import find_scene_collisions
+
+STREAM_CHUNK_SIZE = 1 << 20
+SHARD_SIZE = 8 << 20
+
+# solve function of the worker process, it is created by init_worker
+_solve = None
+
 
 class Point:
 
+    __slots__ = ('x', 'y', 'z')
+
     def __init__(self, x, y, z):
         self.x = x
         self.y = y
@@ -24,10 +76,20 @@ class Point:
         
 class Line:
 
+    __slots__ = ('point1', 'point2', '__dv')
+
     def __init__(self, point1:Point, point2:Point):
         self.point1 = point1
         self.point2 = point2
-        self.dv = self.__get_direct_vector()
+        self.__dv = None
+
+    @property
+    def dv(self) -> Point:
+        """ Direct vector of the line, it is computed on the first use """
+
+        if self.__dv is None:
+            self.__dv = self.__get_direct_vector()
+        return self.__dv
         
     def __get_direct_vector(self) -> Point:
 
@@ -36,10 +98,105 @@ class Line:
         
 class Sphere:
 
+    __slots__ = ('center', 'radius')
+
     def __init__(self, center:Point, radius:float):
         self.center = center
         self.radius = radius
 
+
+def point_from_row(values) -> Point:
+    return Point(*values)
+
+def line_from_row(values) -> Line:
+    return Line(Point(*values[:3]), Point(*values[3:]))
+
+def sphere_from_row(values) -> Sphere:
+    return Sphere(Point(*values[:3]), values[3])
+
+
+class RecordArray:
+    """ Base class of arrays keeping records of fixed number of floats in one contiguous float64 buffer
+
+        subclasses set stride, the number of floats of a record, and _create, the function
+        making the object of a record from its values, records of the base class are tuples
+    """
+
+    stride = 1
+    _create = staticmethod(tuple)
+
+    def __init__(self, values=()):
+        self.buffer = array('d', values)
+        if len(self.buffer) % self.stride:
+            raise ValueError(f'The number of values must be a multiple of {self.stride}')
+
+    @classmethod
+    def from_rows(cls, rows):
+
+        records = cls()
+        for row in rows:
+            records.append(row)
+        return records
+
+    def __len__(self):
+        return len(self.buffer) // self.stride
+
+    def __getitem__(self, i:int):
+
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f'{type(self).__name__} index out of range')
+        return self._create(self.buffer[i * self.stride:(i + 1) * self.stride])
+
+    def append(self, row):
+
+        if len(row) != self.stride:
+            raise ValueError(f'The record must have {self.stride} values')
+        self.buffer.extend(row)
+
+    def columns(self) -> tuple:
+        """ Function returns memoryview of every column without copying the buffer
+
+            the array can't grow while the returned views exist
+        """
+
+        view = memoryview(self.buffer)
+        return tuple(view[k::self.stride] for k in range(self.stride))
+
+
+class PointArray(RecordArray):
+    """ Array of points, every record is (x, y, z) """
+
+    stride = 3
+    _create = staticmethod(point_from_row)
+
+    @classmethod
+    def from_objects(cls, points):
+        return cls.from_rows((point.x, point.y, point.z) for point in points)
+
+
+class LineArray(RecordArray):
+    """ Array of lines, every record is (x1, y1, z1, x2, y2, z2) """
+
+    stride = 6
+    _create = staticmethod(line_from_row)
+
+    @classmethod
+    def from_objects(cls, lines):
+        return cls.from_rows(line_to_row(line) for line in lines)
+
+
+class SphereArray(RecordArray):
+    """ Array of spheres, every record is (cx, cy, cz, radius) """
+
+    stride = 4
+    _create = staticmethod(sphere_from_row)
+
+    @classmethod
+    def from_objects(cls, spheres):
+        return cls.from_rows(sphere_to_row(sphere) for sphere in spheres)
+
 def get_quadratic_equation_coefficients(line:Line, sphere:Sphere) -> list:
     
     dv = line.dv
@@ -67,6 +224,10 @@ def find_collision_point(line:Line, t:float) -> Point:
 
 def solve_quadratic_equation(a, b, c) -> list:
 
+    # a is zero for a line with equal points, it has no direction and no collision
+    if a == 0:
+        return []
+
     desc = b ** 2 - 4 * a * c
     
     if desc < 0:
@@ -80,7 +241,88 @@ def solve_quadratic_equation(a, b, c) -> list:
     x2 = (-b + desc ** 0.5) / (2 * a)
     
     return [x1, x2]
+
+def solve_quadratic_equation_stable(a, b, c, eps:float=0.0) -> list:
+    """ Function solves quadratic equation with the numerically stable citardauq formula
+
+        the discriminant is treated as zero if its absolute value is not greater than
+        eps * (b ** 2 + |4ac|), so tangent lines give one root despite rounding errors.
+        Roots are returned in ascending order.
+    """
+
+    if a == 0:
+        return []
+
+    desc = b * b - 4 * a * c
+    tolerance = eps * (b * b + abs(4 * a * c))
+
+    if desc < -tolerance:
+        return []
+
+    if desc <= tolerance:
+        return [-b / (2 * a)]
+
+    q = -0.5 * (b + math.copysign(math.sqrt(desc), b))
+    x1 = q / a
+    x2 = c / q
+
+    return [x1, x2] if x1 <= x2 else [x2, x1]
+
+QUADRATIC_SOLVERS = ('classic', 'stable')
     
+def _record_pattern() -> str:
+    """ Function builds the regular expression of one source string
+
+        center, radius, point1 and point2 values are captured by groups, every variant of
+        the order of the objects and keys has its own ten groups
+    """
+
+    # whitespace is allowed only once before every token to avoid backtracking,
+    # numbers are matched loosely and checked by float()
+    number = r'\s*([-+.\deE]+)'
+    point = r'\s*\[' + r'\s*,'.join([number] * 3) + r'\s*\]'
+    center = r'\s*center\s*:' + point
+    radius = r'\s*radius\s*:' + number
+    line = r'\s*line\s*:\s*\{' + point + r'\s*,' + point + r'\s*\}'
+
+    def sphere(first, second):
+        return r'\s*sphere\s*:\s*\{' + first + r'\s*,' + second + r'\s*\}'
+
+    variants = (
+        sphere(center, radius) + r'\s*,' + line,
+        sphere(radius, center) + r'\s*,' + line,
+        line + r'\s*,' + sphere(center, radius),
+        line + r'\s*,' + sphere(radius, center),
+    )
+    return r'\s*\{(?:' + '|'.join(f'(?:{variant})' for variant in variants) + r')\s*\}\s*'
+
+RECORD_PATTERN = re.compile(_record_pattern(), re.ASCII)
+
+# positions of center, radius, point1 and point2 values in the groups of every variant of RECORD_PATTERN
+RECORD_GROUPS = (
+    operator.itemgetter(0, 1, 2, 3, 4, 5, 6, 7, 8, 9),
+    operator.itemgetter(11, 12, 13, 10, 14, 15, 16, 17, 18, 19),
+    operator.itemgetter(26, 27, 28, 29, 20, 21, 22, 23, 24, 25),
+    operator.itemgetter(37, 38, 39, 36, 30, 31, 32, 33, 34, 35),
+)
+
+def parse_record(source_string:str) -> tuple:
+    """ Function parses str object like
+
+        '{sphere: {center: [0, 0, 0], radius: 10.67}, line: {[1, 0.5, 15], [43, -14.6, 0.04]}}'
+
+        in one pass and returns tuple of floats (cx, cy, cz, radius, x1, y1, z1, x2, y2, z2).
+        Objects and keys can be placed in any order, whitespace characters are allowed between any tokens.
+
+        Raise ValueError if the string has invalid format.
+    """
+
+    match = RECORD_PATTERN.fullmatch(source_string)
+    if match is None:
+        raise ValueError(f'Invalid data format: {source_string!r}')
+
+    return tuple(map(float, RECORD_GROUPS[(match.lastindex - 1) // 10](match.groups())))
+
 def convert_source_to_dict(source_string:str) -> dict:
     """ Function convert str object like
 
@@ -90,19 +332,10 @@ def convert_source_to_dict(source_string:str) -> dict:
 
         {'sphere': {'center': [0.0, 0.0, 0.0], 'radius': 10.67}, 'line': {'point1': [1.0, 0.5, 15.0], 'point2': [43.0, -14.6, 0.04]}}
     """
-    source = source_string.split('}')
-    for sep in ('{', ':', '[', ']', ',', ' '):
-        source = ''.join(source).split(sep)
-    
-    objects = []
-    for el, cnt in (('radius', 2), ('center', 4), ('line', 7)):
-        i = source.index(el)
-        objects.append([float(x) for x in source[i + 1 : i + cnt]])
-        
-    radius, center, line = objects
-    point1, point2 = line[:3], line[3:]
-    
-    return {'sphere': {'center': center, 'radius': radius[0]}, 'line': {'point1': point1, 'point2': point2}}
+
+    cx, cy, cz, radius, x1, y1, z1, x2, y2, z2 = parse_record(source_string)
+
+    return {'sphere': {'center': [cx, cy, cz], 'radius': radius}, 'line': {'point1': [x1, y1, z1], 'point2': [x2, y2, z2]}}
    
 def create_line(source:str):
     """ Function gets str object in the folowing format: 
@@ -130,11 +363,28 @@ def create_sphere(source:str):
     
     return Sphere(center, radius)
 
-def find_sphere_line_collision(line:Line, sphere:Sphere):
+def find_sphere_line_collision(line:Line, sphere:Sphere, solver:str='classic', eps:float=0.0, mode:str='all'):
+    """ Function returns collision points of the line and the sphere as text
+
+        solver is 'classic' for solve_quadratic_equation or 'stable' for solve_quadratic_equation_stable with eps,
+        mode is one of QUERY_MODES (see batch.py)
+    """
 
     a, b, c = get_quadratic_equation_coefficients(line, sphere)
 
-    ans = solve_quadratic_equation(a, b, c)
+    if solver == 'stable':
+        ans = solve_quadratic_equation_stable(a, b, c, eps)
+    else:
+        ans = solve_quadratic_equation(a, b, c)
+
+    if mode != 'all' and ans:
+        t_max = math.inf if mode == 'ray' else 1
+        ans = [t for t in ans if 0 <= t <= t_max]
+        if mode in ('first_hit', 'any_hit'):
+            del ans[1:]
+
+    if mode == 'any_hit':
+        return 'Collision detected' if ans else 'No collision detected'
 
     if len(ans) == 1:
         t = ans[0]
@@ -152,9 +402,358 @@ def find_sphere_line_collision(line:Line, sphere:Sphere):
 
     return 'No collision detected'
    
+def solve_lines(lines, solve=find_sphere_line_collision_texts) -> tuple:
+    """ Function parses and solves a batch of lines from the source file
+
+        solve gets lists of line and sphere rows and returns list of collision texts
+
+        return results, records, malformed where results contains the collision text of every
+        not empty line, or the index of the line in the batch if the line has invalid format
+    """
+
+    results = []
+    lines_rows = []
+    spheres_rows = []
+    malformed = 0
+
+    with stages.stage('parse'):
+        for index, line in enumerate(lines):
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                record = parse_record(line)
+            except ValueError:
+                results.append(index)
+                malformed += 1
+                continue
+
+            spheres_rows.append(record[:4])
+            lines_rows.append(record[4:])
+            results.append(None)
+
+    texts = solve(lines_rows, spheres_rows)
+
+    record = 0
+    for i, result in enumerate(results):
+        if result is None:
+            results[i] = f'{texts[record]}\n'
+            record += 1
+
+    return results, record, malformed
+
+def format_results(results:list, first_line_number:int) -> str:
+    """ Function joins results of solve_lines, line numbers of invalid lines start from first_line_number """
+
+    return ''.join(
+        f'String {first_line_number + result}: invalid data format\n' if isinstance(result, int) else result
+        for result in results
+    )
+
+def solve_file(source_file, solve=find_sphere_line_collision_texts, chunk_size:int=STREAM_CHUNK_SIZE):
+    """ Function reads the text file by chunks of about chunk_size bytes and solves them
+
+        yield results of solve_lines and the number of lines of every chunk
+    """
+
+    lines = source_file.readlines(chunk_size)
+    while lines:
+        yield solve_lines(lines, solve), len(lines)
+        lines = source_file.readlines(chunk_size)
+
+def find_shards(file_name:str, shard_size:int=SHARD_SIZE) -> list:
+    """ Function splits the file into byte ranges of about shard_size bytes
+
+        every range ends at a line boundary, return list of (start, end) tuples
+    """
+
+    size = os.path.getsize(file_name)
+    shards = []
+
+    with open(file_name, 'rb') as source_file:
+        start = 0
+        while start < size:
+            source_file.seek(start + shard_size)
+            source_file.readline()
+            end = min(source_file.tell(), size)
+            shards.append((start, end))
+            start = end
+
+    return shards
+
+def create_solve(solver:str='classic', eps:float=0.0, mode:str='all', cache:int=0):
+    """ Function returns the solve function of the streaming mode, CachedSolver if cache size is set """
+
+    solve = functools.partial(find_sphere_line_collision_texts, solver=solver, eps=eps, mode=mode)
+    if cache:
+        solve = CachedSolver(solve, cache)
+    return solve
+
+def init_worker(solver:str, eps:float, mode:str, cache:int):
+    """ Function creates the solve function of the worker process, its cache is kept for all shards """
+
+    global _solve
+    _solve = create_solve(solver, eps, mode, cache)
+
+def solve_shard(file_name:str, start:int, end:int, profile:bool=False) -> tuple:
+    """ Function solves lines of the file between start and end bytes in the worker process
+
+        return lines, results, records, malformed, stats where results contains the collision text
+        of the shard and the indexes of invalid lines counted from the beginning of the shard,
+        stats has the worker pid, hits and misses of its cache since the start of the worker
+        and stage times of the shard if profile is True
+    """
+
+    solve = _solve
+    if profile:
+        stages.enable()
+
+    with open(file_name, 'rb') as source_file:
+        source_file.seek(start)
+        data = source_file.read(end - start)
+
+    lines = 0
+    text = []
+    results = []
+    records = 0
+    malformed = 0
+
+    for (chunk_results, chunk_records, chunk_malformed), chunk_lines in solve_file(io.StringIO(data.decode(), newline=None), solve):
+        for result in chunk_results:
+            if isinstance(result, int):
+                results.append(''.join(text))
+                results.append(lines + result)
+                text = []
+            else:
+                text.append(result)
+
+        lines += chunk_lines
+        records += chunk_records
+        malformed += chunk_malformed
+
+    results.append(''.join(text))
+
+    stats = {'worker': os.getpid(), 'cache': get_cache_counts(solve), 'stages': stages.get_totals()}
+
+    return lines, results, records, malformed, stats
+
+def get_cache_counts(solve) -> tuple:
+    """ Function returns hits and misses of the cache of CachedSolver or None for other solve functions """
+
+    if isinstance(solve, CachedSolver):
+        return solve.cache.hits, solve.cache.misses
+    return None
+
+def solve_shards(file_name:str, workers:int, solver:str='classic', eps:float=0.0, mode:str='all', cache:int=0):
+    """ Function solves shards of the file in worker processes
+
+        yield results of solve_shard in the order of the shards
+    """
+
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(solver, eps, mode, cache)) as executor:
+        pending = deque()
+        for start, end in find_shards(file_name):
+            pending.append(executor.submit(solve_shard, file_name, start, end, stages.is_enabled()))
+            if len(pending) > 2 * workers:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+def run_stream(file_name:str, workers:int=1, solver:str='classic', eps:float=0.0, mode:str='all', cache:int=0):
+    """ Function processes the file by chunks and reports the processing speed
+
+        if workers is more than one the chunks are solved in a pool of worker processes,
+        cache is the size of the result cache of every process, 0 turns the cache off
+    """
+
+    start = time.perf_counter()
+    line_number = 1
+    records = 0
+    malformed = 0
+    # the latest cumulative hits and misses of every worker process
+    worker_cache_counts = {}
+    write = sys.stdout.write
+    solve = create_solve(solver, eps, mode, cache)
+
+    with open(file_name, 'r', buffering=STREAM_CHUNK_SIZE) as source_file:
+        if workers > 1:
+            chunks = solve_shards(file_name, workers, solver, eps, mode, cache)
+        else:
+            chunks = ((lines, results, chunk_records, chunk_malformed, None)
+                      for (results, chunk_records, chunk_malformed), lines in solve_file(source_file, solve))
+
+        for lines, results, chunk_records, chunk_malformed, stats in chunks:
+            with stages.stage('format'):
+                text = format_results(results, line_number)
+            with stages.stage('output'):
+                write(text)
+
+            line_number += lines
+            records += chunk_records
+            malformed += chunk_malformed
+
+            if stats is not None:
+                stages.add_totals(stats['stages'])
+                counts = stats['cache']
+                previous = worker_cache_counts.get(stats['worker'])
+                if counts is not None and (previous is None or sum(counts) > sum(previous)):
+                    worker_cache_counts[stats['worker']] = counts
+
+    if line_number == 1:
+        print("File is empty")
+
+    if workers <= 1:
+        cache_counts = get_cache_counts(solve)
+    elif worker_cache_counts:
+        cache_counts = tuple(map(sum, zip(*worker_cache_counts.values())))
+    else:
+        cache_counts = None
+
+    report_speed(start, records, malformed, cache_counts)
+
+def report_speed(start:float, records:int, malformed:int=0, cache_counts:tuple=None):
+    """ Function prints the number of processed records and the speed since start to stderr
+
+        cache_counts are hits and misses of the result cache if it is used
+    """
+
+    sys.stdout.flush()
+    elapsed = time.perf_counter() - start
+    speed = records / elapsed if elapsed else 0
+    print(f'Records: {records}, malformed lines: {malformed}, time: {elapsed:.3f} s, {speed:.0f} records/sec', file=sys.stderr)
+
+    if cache_counts is not None:
+        hits, misses = cache_counts
+        hit_rate = hits / (hits + misses) if hits + misses else 0
+        print(f'Cache hits: {hits}, misses: {misses}, hit rate: {hit_rate:.1%}', file=sys.stderr)
+
+def report_stages():
+    """ Function prints the time of every processing stage to stderr if the timing is on """
+
+    if stages.is_enabled():
+        sys.stdout.flush()
+        print(stages.format_totals(stages.get_totals()), file=sys.stderr)
+
+def convert_text_to_binary(text_name:str, binary_name:str) -> tuple:
+    """ Function converts the text source file to binary records file
+
+        return the numbers of records and malformed lines, malformed lines are skipped
+    """
+
+    records = 0
+    malformed = 0
+
+    with open(text_name, 'r') as text_file, open(binary_name, 'wb') as binary_file:
+        binary_file.write(binary_format.RECORDS_MAGIC)
+
+        lines = text_file.readlines(STREAM_CHUNK_SIZE)
+        while lines:
+            rows = []
+            for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rows.append(parse_record(line))
+                except ValueError:
+                    malformed += 1
+
+            binary_format.write_records(binary_file, rows)
+            records += len(rows)
+            lines = text_file.readlines(STREAM_CHUNK_SIZE)
+
+    return records, malformed
+
+def run_binary(file_name:str, output_name:str=None, solver:str='classic', eps:float=0.0, mode:str='all'):
+    """ Function solves binary records file
+
+        results are written to output_name results file or printed in the text format if output_name is None
+    """
+
+    start = time.perf_counter()
+
+    if output_name is not None:
+        records = binary_format.solve_binary_file(file_name, output_name, solver, eps, mode)
+    else:
+        records = 0
+        for columns in binary_format.read_records(file_name):
+            hits, first, second = binary_format.solve_records(columns, solver, eps, mode)
+            sys.stdout.write(binary_format.format_results(hits, first, second, mode))
+            records += len(hits)
+
+    report_speed(start, records)
+
+def run_scene(file_name:str, solver:str='classic', eps:float=0.0, mode:str='all'):
+    """ Function checks every distinct line of the file against every distinct sphere of the file """
+
+    lines = {}
+    spheres = {}
+    malformed = 0
+
+    with open(file_name, 'r') as source_file:
+        for line in source_file:
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                record = parse_record(line)
+            except ValueError:
+                malformed += 1
+                continue
+
+            spheres.setdefault(record[:4], len(spheres))
+            lines.setdefault(record[4:], len(lines))
+
+    if not lines:
+        print("File is empty")
+        return
+
+    lines = list(lines)
+    collisions = find_scene_collisions(lines, list(spheres), solver, eps, mode)
+
+    collided = set()
+    for i, j, result in collisions:
+        collided.add(i)
+        print(f'Line {i + 1}, sphere {j + 1}:{result}')
+
+    for i in range(len(lines)):
+        if i not in collided:
+            print(f'Line {i + 1}: No collision detected')
+
+    print(f'Lines: {len(lines)}, spheres: {len(spheres)}, collisions: {len(collisions)}, malformed lines: {malformed}', file=sys.stderr)
+
+def parse_arguments(arguments:list):
+
+    parser = argparse.ArgumentParser(description='Find collision points of spheres and lines from the source file.')
+    parser.add_argument('file_name', help='file with the sphere and line data')
+    parser.add_argument('--stream', action='store_true', help='process the file in chunks and report the speed')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes, implies --stream')
+    parser.add_argument('--scene', action='store_true', help='check every line against every sphere of the file')
+    parser.add_argument('--to-binary', metavar='OUTPUT', help='convert the text file to binary records file')
+    parser.add_argument('--output', metavar='OUTPUT', help='binary results file for binary records input')
+    parser.add_argument('--solver', choices=QUADRATIC_SOLVERS, default='classic',
+                        help="'classic' formula or numerically 'stable' citardauq formula")
+    parser.add_argument('--eps', type=float, default=0.0, help='relative tangency tolerance of the stable solver')
+    parser.add_argument('--mode', choices=QUERY_MODES, default='all',
+                        help="'all' points of the infinite line, 'ray' points from point1 on, "
+                             "'segment_only' points between point1 and point2, "
+                             "'first_hit' the nearest point of the segment or 'any_hit' yes/no answer")
+    parser.add_argument('--cache', type=int, default=0, metavar='SIZE',
+                        help='keep results of SIZE last distinct records and reuse them for repeated records, implies --stream')
+    parser.add_argument('--profile', action='store_true', help='print the time of every processing stage at the end')
+
+    return parser.parse_args(arguments)
+
 def main():
     
-    file_name = sys.argv[1]
+    arguments = parse_arguments(sys.argv[1:])
+    file_name = arguments.file_name
+
+    if arguments.profile:
+        stages.enable()
     
     try:
         f = open(file_name, 'r')
@@ -162,6 +761,23 @@ def main():
     except:
         print("Couldn't open the file")
     else:
+        if arguments.to_binary:
+            records, malformed = convert_text_to_binary(file_name, arguments.to_binary)
+            print(f'Records: {records}, malformed lines: {malformed}')
+            return
+
+        if binary_format.is_records_file(file_name):
+            run_binary(file_name, arguments.output, arguments.solver, arguments.eps, arguments.mode)
+            return
+
+        if arguments.scene:
+            run_scene(file_name, arguments.solver, arguments.eps, arguments.mode)
+            return
+
+        if arguments.stream or arguments.workers > 1 or arguments.cache:
+            run_stream(file_name, arguments.workers, arguments.solver, arguments.eps, arguments.mode, arguments.cache)
+            return
+
         with open(file_name, 'r') as source_file:
             count = 0
             for line in source_file:
@@ -171,7 +787,8 @@ def main():
                     continue
                 
                 try:
-                    source = convert_source_to_dict(line)
+                    with stages.stage('parse'):
+                        source = convert_source_to_dict(line)
                 except:
                     print(f'String {count}: invalid data format')
                     print("""
@@ -179,27 +796,30 @@ Data about the sphere and line should have folowing format:
 
                     {sphere: {center: [0, 0, 0], radius: 10.67}, line: {[1, 0.5, 15], [43, -14.6, 0.04]}}
                         
-Objects and keys can be placed in a free sequence. Observe the placement of whitespace characters inside objects
+Objects and keys can be placed in a free sequence, whitespace characters between them are allowed
 """)
 
                 else:
                 
-                    line_source = source.get('line')
-                    line = create_line(line_source)
-                    
-                    sphere_source = source.get('sphere')
-                    sphere = create_sphere(sphere_source)
+                    with stages.stage('construct'):
+                        line_source = source.get('line')
+                        line = create_line(line_source)
+
+                        sphere_source = source.get('sphere')
+                        sphere = create_sphere(sphere_source)
 
-                    print(find_sphere_line_collision(line, sphere))
+                    with stages.stage('solve'):
+                        result = find_sphere_line_collision(line, sphere, arguments.solver, arguments.eps, arguments.mode)
+
+                    with stages.stage('output'):
+                        print(result)
 
             if count == 0:
                 print("File is empty")
 
 if __name__ == '__main__':
 
-    import sys
-
-    if len(sys.argv) != 2:
+    if len(sys.argv) < 2:
         print("""
 Pass the name of the file with the sphere and line data as a command-line argument, for example: main.py main.txt
         
@@ -207,10 +827,11 @@ Data about the sphere and line should have folowing format:
 
                     {sphere: {center: [0, 0, 0], radius: 10.67}, line: {[1, 0.5, 15], [43, -14.6, 0.04]}}
                         
-Objects and keys can be placed in a free sequence. Observe the placement of whitespace characters inside objects.
+Objects and keys can be placed in a free sequence, whitespace characters between them are allowed.
 """)
     else:
         main()
+        report_stages()
     
 
     
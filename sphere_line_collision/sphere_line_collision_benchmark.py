@@ -0,0 +1,397 @@
+""" Benchmarks of sphere_line_collision.py
+
+    To run benchmarks enter 'sphere_line_collision_benchmark.py benchmark_name' in console.
+
+    Available benchmarks:
+
+    parser - compares parse_record with the previous split based parser on test.txt
+    scene  - compares SphereBVH with checking every line against every sphere for growing numbers of spheres
+    memory - reports memory per million records for the previous classes, __slots__ classes and record arrays
+    solver - compares accuracy and speed of the classic and the stable quadratic solvers on random records
+    generate - writes a synthetic scene file with --records records, --hit-ratio of lines crossing their
+               spheres and --malformed-ratio of corrupted lines to --output
+    run    - generates a scene file like generate and runs sphere_line_collision.py on it with --profile,
+             reports records/sec, peak RSS and the time of parse, construct, solve, format and output stages,
+             add --stream or --workers N to measure the streaming modes
+"""
+
+import argparse
+import decimal
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from fractions import Fraction
+
+from batch import solve_quadratic_equation_batch, solve_quadratic_equation_stable_batch
+from scene import find_scene_collisions, find_scene_collisions_brute
+from sphere_line_collision import (Line, LineArray, Point, Sphere, SphereArray, get_quadratic_equation_coefficients,
+                                   parse_record, solve_quadratic_equation, solve_quadratic_equation_stable)
+
+TEST_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test.txt')
+SCRIPT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sphere_line_collision.py')
+
+
+def convert_source_to_dict_by_split(source_string:str) -> dict:
+    """ The previous implementation of convert_source_to_dict, it is kept as the baseline """
+
+    source = source_string.split('}')
+    for sep in ('{', ':', '[', ']', ',', ' '):
+        source = ''.join(source).split(sep)
+
+    objects = []
+    for el, cnt in (('radius', 2), ('center', 4), ('line', 7)):
+        i = source.index(el)
+        objects.append([float(x) for x in source[i + 1 : i + cnt]])
+
+    radius, center, line = objects
+    point1, point2 = line[:3], line[3:]
+
+    return {'sphere': {'center': center, 'radius': radius[0]}, 'line': {'point1': point1, 'point2': point2}}
+
+class DictPoint:
+    """ The previous Point class with per-instance __dict__, it is kept as the baseline """
+
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+class DictLine:
+    """ The previous Line class, the direct vector is created in __init__ """
+
+    def __init__(self, point1, point2):
+        self.point1 = point1
+        self.point2 = point2
+        self.dv = DictPoint(point2.x - point1.x, point2.y - point1.y, point2.z - point1.z)
+
+
+class DictSphere:
+    """ The previous Sphere class """
+
+    def __init__(self, center, radius):
+        self.center = center
+        self.radius = radius
+
+def parse_all(parser, lines:list):
+
+    for line in lines:
+        try:
+            parser(line)
+        except (ValueError, IndexError):
+            pass
+
+def benchmark_parser(repeat:int):
+
+    with open(TEST_FILE, 'r') as source_file:
+        lines = [line.strip() for line in source_file if line.strip()]
+
+    for line in lines:
+        try:
+            expected = convert_source_to_dict_by_split(line)
+        except (ValueError, IndexError):
+            continue
+        try:
+            cx, cy, cz, radius, x1, y1, z1, x2, y2, z2 = parse_record(line)
+        except ValueError:
+            print(f'Rejected by parse_record: {line}')
+            continue
+        assert expected == {'sphere': {'center': [cx, cy, cz], 'radius': radius},
+                            'line': {'point1': [x1, y1, z1], 'point2': [x2, y2, z2]}}
+
+    records = len(lines) * repeat
+    for name, parser in (('split', convert_source_to_dict_by_split), ('parse_record', parse_record)):
+        elapsed = min(timeit.repeat(lambda: parse_all(parser, lines), number=repeat, repeat=5))
+        print(f'{name:>12}: {elapsed:.3f} s, {records / elapsed:.0f} lines/sec')
+
+def generate_scene(lines_number:int, spheres_number:int, size:float=1000.0) -> tuple:
+    """ Function returns random lines crossing the scene cube and small random spheres inside it """
+
+    def point():
+        return [random.uniform(-size, size) for _ in range(3)]
+
+    lines = [tuple(point() + point()) for _ in range(lines_number)]
+    spheres = [tuple(point() + [random.uniform(1, size / 50)]) for _ in range(spheres_number)]
+
+    return lines, spheres
+
+def benchmark_scene(lines_number:int):
+
+    random.seed(0)
+    print(f'{"spheres":>8} {"brute, s":>10} {"bvh, s":>10} {"speedup":>8}')
+
+    for spheres_number in (10, 100, 1000, 5000):
+        lines, spheres = generate_scene(lines_number, spheres_number)
+
+        start = time.perf_counter()
+        expected = find_scene_collisions_brute(lines, spheres)
+        brute_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = find_scene_collisions(lines, spheres)
+        bvh_time = time.perf_counter() - start
+
+        assert result == expected
+        print(f'{spheres_number:>8} {brute_time:>10.3f} {bvh_time:>10.3f} {brute_time / bvh_time:>8.1f}')
+
+    # near misses are tangent for the stable solver with eps, the BVH must not drop them
+    lines, spheres = generate_scene(lines_number, 100)
+    lines.append((-1000, 1.0001, 0, 1000, 1.0001, 0))
+    spheres.append((0, 0, 0, 1))
+    for mode in ('all', 'segment_only'):
+        expected = find_scene_collisions_brute(lines, spheres, 'stable', 1e-9, mode)
+        assert find_scene_collisions(lines, spheres, 'stable', 1e-9, mode) == expected
+        assert any(i == len(lines) - 1 for i, _, _ in expected)
+
+def measure_memory(create) -> int:
+    """ Function returns the number of bytes allocated by create() and still alive """
+
+    tracemalloc.start()
+    data = create()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del data
+
+    return size
+
+def benchmark_memory(records_number:int):
+
+    random.seed(0)
+    rows = [tuple(random.uniform(-100, 100) for _ in range(10)) for _ in range(records_number)]
+
+    def objects(point, line, sphere):
+        return [(line(point(*row[4:7]), point(*row[7:])), sphere(point(*row[:3]), row[3])) for row in rows]
+
+    variants = (
+        ('__dict__ classes', lambda: objects(DictPoint, DictLine, DictSphere)),
+        ('__slots__ classes', lambda: objects(Point, Line, Sphere)),
+        ('record arrays', lambda: (LineArray.from_rows(row[4:] for row in rows), SphereArray.from_rows(row[:4] for row in rows))),
+    )
+
+    scale = 1_000_000 / records_number
+    for name, create in variants:
+        size = measure_memory(create) * scale
+        print(f'{name:>18}: {size / 2 ** 20:8.1f} MB per million records, {size / 1_000_000:6.1f} bytes per record')
+
+def get_coefficients(row:tuple) -> tuple:
+    """ Function returns a, b, c of the quadratic equation of the record as sphere_line_collision.py does """
+
+    cx, cy, cz, r, x1, y1, z1, x2, y2, z2 = row
+    line = Line(Point(x1, y1, z1), Point(x2, y2, z2))
+    sphere = Sphere(Point(cx, cy, cz), r)
+
+    return tuple(get_quadratic_equation_coefficients(line, sphere))
+
+def generate_equations(number:int) -> dict:
+    """ Function returns coefficients of random records of different kinds
+
+        random  - random lines and spheres
+        surface - lines starting very close to the sphere surface, one root is close to zero
+        far     - short lines far from the sphere pointing to it, roots are big and close to each other
+        tangent - lines touching the sphere in exact arithmetic
+    """
+
+    def random_point(size=100.0):
+        return [random.uniform(-size, size) for _ in range(3)]
+
+    def surface_point(center, r):
+        direction = random_point(1.0)
+        length = sum(value ** 2 for value in direction) ** 0.5
+        return [c + r * value / length * (1 + random.uniform(-1e-9, 1e-9)) for c, value in zip(center, direction)]
+
+    kinds = {'random': [], 'surface': [], 'far': [], 'tangent': []}
+    for _ in range(number):
+        center = random_point()
+        r = random.uniform(1, 50)
+        kinds['random'].append(random_point() + random_point())
+        kinds['surface'].append(surface_point(center, r) + random_point())
+
+        far = [c + 1e6 for c in center]
+        kinds['far'].append(far + [value - 1e-3 + random.uniform(-1e-9, 1e-9) for value in far])
+        kinds['tangent'].append([center[0] - 10, center[1] + r, center[2], center[0] + 10, center[1] + r, center[2]])
+
+        for kind in kinds:
+            kinds[kind][-1] = get_coefficients(tuple(center) + (r,) + tuple(kinds[kind][-1]))
+
+    return kinds
+
+def exact_roots(a:float, b:float, c:float) -> list:
+    """ Function returns roots of the equation computed with 60 significant digits """
+
+    desc = Fraction(b) ** 2 - 4 * Fraction(a) * Fraction(c)
+    if desc < 0:
+        return []
+
+    with decimal.localcontext() as context:
+        context.prec = 60
+        root = (decimal.Decimal(desc.numerator) / decimal.Decimal(desc.denominator)).sqrt()
+        return [(-decimal.Decimal(b) - root) / (2 * decimal.Decimal(a)),
+                (-decimal.Decimal(b) + root) / (2 * decimal.Decimal(a))]
+
+def relative_errors(solve, equations:list) -> list:
+
+    errors = []
+    for a, b, c in equations:
+        expected = exact_roots(a, b, c)
+        roots = solve(a, b, c)
+        if len(expected) != 2 or len(roots) != 2:
+            continue
+        for root, exact in zip(roots, expected):
+            if exact:
+                errors.append(float(abs((decimal.Decimal(root) - exact) / exact)))
+
+    return errors
+
+def benchmark_solver(number:int, eps:float):
+
+    random.seed(0)
+    kinds = generate_equations(number)
+    solvers = (('classic', solve_quadratic_equation),
+               ('stable', lambda a, b, c: solve_quadratic_equation_stable(a, b, c, eps)))
+
+    print(f'Relative error of roots, {number} equations of every kind, eps = {eps}')
+    print(f'{"kind":>8} {"solver":>8} {"max error":>12} {"mean error":>12} {"one root":>9}')
+    for kind in ('random', 'surface', 'far'):
+        for name, solve in solvers:
+            errors = relative_errors(solve, kinds[kind])
+            print(f'{kind:>8} {name:>8} {max(errors):>12.3e} {sum(errors) / len(errors):>12.3e}')
+
+    for name, solve in solvers:
+        tangent = sum(len(solve(*equation)) == 1 for equation in kinds['tangent'])
+        print(f'{"tangent":>8} {name:>8} {"":>12} {"":>12} {tangent / number:>9.1%}')
+
+    equations = [equation for kind in kinds.values() for equation in kind]
+    a_values, b_values, c_values = (list(column) for column in zip(*equations))
+    variants = (
+        ('classic scalar', lambda: [solve_quadratic_equation(a, b, c) for a, b, c in equations]),
+        ('stable scalar', lambda: [solve_quadratic_equation_stable(a, b, c, eps) for a, b, c in equations]),
+        ('classic batch', lambda: solve_quadratic_equation_batch(a_values, b_values, c_values)),
+        ('stable batch', lambda: solve_quadratic_equation_stable_batch(a_values, b_values, c_values, eps)),
+    )
+
+    print()
+    for name, run in variants:
+        elapsed = min(timeit.repeat(run, number=1, repeat=5))
+        print(f'{name:>15}: {len(equations) / elapsed:.0f} equations/sec')
+
+def generate_record(hit:bool, size:float=1000.0) -> str:
+    """ Function returns a random record, its line crosses the sphere if hit is True """
+
+    center = [random.uniform(-size, size) for _ in range(3)]
+    radius = random.uniform(1.0, size / 10)
+    direction = [random.gauss(0.0, 1.0) for _ in range(3)]
+    length = sum(d * d for d in direction) ** 0.5 or 1.0
+    direction = [d / length for d in direction]
+
+    # the line goes through a point at the distance offset from the center perpendicular to the direction
+    normal = [direction[1], -direction[0], 0.0] if direction[2] ** 2 < 0.9 else [0.0, direction[2], -direction[1]]
+    normal_length = sum(n * n for n in normal) ** 0.5
+    offset = random.uniform(0.0, 0.9) * radius if hit else random.uniform(1.1, 3.0) * radius
+    base = [c + offset * n / normal_length for c, n in zip(center, normal)]
+
+    t1, t2 = random.uniform(-2 * size, 0.0), random.uniform(0.0, 2 * size)
+    p1 = ', '.join(f'{b + t1 * d:.6g}' for b, d in zip(base, direction))
+    p2 = ', '.join(f'{b + t2 * d:.6g}' for b, d in zip(base, direction))
+    center = ', '.join(f'{c:.6g}' for c in center)
+
+    sphere = [f'center: [{center}]', f'radius: {radius:.6g}']
+    random.shuffle(sphere)
+    parts = [f'sphere: {{{", ".join(sphere)}}}', f'line: {{[{p1}], [{p2}]}}']
+    random.shuffle(parts)
+
+    return f'{{{", ".join(parts)}}}'
+
+def corrupt_record(record:str) -> str:
+    """ Function breaks the record, so the parser rejects it """
+
+    position = random.randrange(len(record))
+    corruption = random.choice(('drop', 'letter', 'cut'))
+    if corruption == 'drop':
+        bracket = random.choice([i for i, char in enumerate(record) if char in '[]{}:'])
+        return record[:bracket] + record[bracket + 1:]
+    if corruption == 'letter':
+        digit = random.choice([i for i, char in enumerate(record) if char.isdigit()] or [position])
+        return record[:digit] + 'x' + record[digit + 1:]
+    return record[:position]
+
+def generate_file(file_name:str, records_number:int, hit_ratio:float, malformed_ratio:float, seed:int=0):
+    """ Function writes the synthetic scene file """
+
+    random.seed(seed)
+    with open(file_name, 'w') as scene_file:
+        for _ in range(records_number):
+            record = generate_record(random.random() < hit_ratio)
+            if random.random() < malformed_ratio:
+                record = corrupt_record(record)
+            scene_file.write(record + '\n')
+
+def benchmark_run(file_name:str, records_number:int, options:list):
+    """ Function runs sphere_line_collision.py with --profile on the file and prints its measurements """
+
+    command = [sys.executable, SCRIPT_FILE, file_name, '--profile', *options]
+    start = time.perf_counter()
+    completed = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss of children is the peak of the biggest child process, in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+    print(' '.join(command[1:]))
+    print(f'Records: {records_number}, time: {elapsed:.3f} s, {records_number / elapsed:.0f} records/sec')
+    print(f'Peak RSS: {peak_rss / 1024:.1f} MB')
+    for line in completed.stderr.splitlines():
+        if line.startswith(('Stage', 'Cache', 'Records')):
+            print(line)
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmarks of sphere_line_collision.py')
+    parser.add_argument('benchmark', choices=('parser', 'scene', 'memory', 'solver', 'generate', 'run'))
+    parser.add_argument('--repeat', type=int, default=10000, help='how many times the data set is processed')
+    parser.add_argument('--lines', type=int, default=200, help='number of lines in the scene benchmark')
+    parser.add_argument('--records', type=int, default=100000, help='number of records in the memory and solver benchmarks')
+    parser.add_argument('--eps', type=float, default=1e-12, help='tangency tolerance of the stable solver')
+    parser.add_argument('--hit-ratio', type=float, default=0.5, help='share of generated lines crossing their spheres')
+    parser.add_argument('--malformed-ratio', type=float, default=0.05, help='share of generated malformed lines')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the generated scene file')
+    parser.add_argument('--output', help='generated scene file, a temporary file is used by run if it is missing')
+    parser.add_argument('--stream', action='store_true', help='run sphere_line_collision.py in the streaming mode')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes of the streaming mode')
+    arguments = parser.parse_args()
+
+    if arguments.benchmark == 'parser':
+        benchmark_parser(arguments.repeat)
+    elif arguments.benchmark == 'scene':
+        benchmark_scene(arguments.lines)
+    elif arguments.benchmark == 'memory':
+        benchmark_memory(arguments.records)
+    elif arguments.benchmark == 'solver':
+        benchmark_solver(arguments.records // 10, arguments.eps)
+    elif arguments.benchmark == 'generate':
+        if arguments.output is None:
+            parser.error('generate needs --output')
+        generate_file(arguments.output, arguments.records, arguments.hit_ratio, arguments.malformed_ratio, arguments.seed)
+    elif arguments.benchmark == 'run':
+        options = ['--stream'] if arguments.stream else []
+        if arguments.workers > 1:
+            options += ['--workers', str(arguments.workers)]
+
+        if arguments.output is not None:
+            generate_file(arguments.output, arguments.records, arguments.hit_ratio, arguments.malformed_ratio, arguments.seed)
+            benchmark_run(arguments.output, arguments.records, options)
+        else:
+            with tempfile.TemporaryDirectory() as directory:
+                file_name = os.path.join(directory, 'scene.txt')
+                generate_file(file_name, arguments.records, arguments.hit_ratio, arguments.malformed_ratio, arguments.seed)
+                benchmark_run(file_name, arguments.records, options)
+
+
+if __name__ == '__main__':
+
+    main()
@@ -0,0 +1,71 @@
+""" Opt-in timing of processing stages.
+
+    The processing code wraps its stages into 'with stage(name):' blocks. The blocks do nothing
+    until enable() is called, after that the time of every stage is summed up, so the same hooks
+    can be switched on in production runs to find hot spots.
+
+    Stages of sphere_line_collision.py:
+
+        parse     - parsing source strings into numbers
+        construct - building objects or columns from the numbers
+        solve     - solving quadratic equations and finding collision points
+        format    - converting results to text
+        output    - writing the text
+"""
+
+import time
+from contextlib import contextmanager, nullcontext
+
+_NO_TIMING = nullcontext()
+
+_totals = None
+
+
+def enable():
+    """ Function switches timing on and resets the totals """
+
+    global _totals
+    _totals = {}
+
+def disable():
+
+    global _totals
+    _totals = None
+
+def is_enabled() -> bool:
+    return _totals is not None
+
+def stage(name:str):
+    """ Function returns context manager adding the time of the block to the total of the stage """
+
+    if _totals is None:
+        return _NO_TIMING
+    return _measure(name)
+
+@contextmanager
+def _measure(name:str):
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _totals[name] = _totals.get(name, 0.0) + time.perf_counter() - start
+
+def get_totals() -> dict:
+    """ Function returns a copy of the totals in seconds, it is empty if timing is off """
+
+    return dict(_totals or {})
+
+def add_totals(totals:dict):
+    """ Function adds totals measured somewhere else, for example in a worker process """
+
+    if _totals is not None:
+        for name, seconds in totals.items():
+            _totals[name] = _totals.get(name, 0.0) + seconds
+
+def format_totals(totals:dict) -> str:
+    """ Function returns the totals as text lines with the share of every stage """
+
+    total = sum(totals.values())
+    return '\n'.join(f'Stage {name}: {seconds:.3f} s ({seconds / total if total else 0:.1%})'
+                     for name, seconds in totals.items())
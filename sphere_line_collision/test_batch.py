@@ -0,0 +1,153 @@
+""" Checks of the batch engine against the scalar reference implementation.
+
+    Run 'python -m pytest test_batch.py' or 'python test_batch.py' in this folder.
+"""
+
+import math
+import random
+
+import batch
+from batch import (QUERY_MODES, find_sphere_line_collision_batch, find_sphere_line_collision_texts,
+                   format_collision_batch)
+from sphere_line_collision import QUADRATIC_SOLVERS, Line, Point, Sphere, find_sphere_line_collision
+
+SOLVER_EPS = {'classic': (0.0,), 'stable': (0.0, 1e-9)}
+
+
+def generate_records(number:int=2000, seed:int=0) -> list:
+    """ Function returns (line_row, sphere_row) records of several kinds
+
+        random lines, tangent lines, segments ending before, inside and after the sphere,
+        rays pointing away from the sphere and lines with equal points
+    """
+
+    rng = random.Random(seed)
+    records = []
+
+    def coordinate():
+        return round(rng.uniform(-20, 20), rng.choice((0, 2, 6)))
+
+    for i in range(number):
+        cx, cy, cz = coordinate(), coordinate(), coordinate()
+        r = round(rng.uniform(0.5, 10), 2)
+        kind = i % 5
+
+        if kind == 0:
+            line = tuple(coordinate() for _ in range(6))
+        elif kind == 1:
+            # tangent at the top of the sphere along the x axis
+            x = coordinate()
+            line = (cx + x, cy + r, cz, cx + x + rng.choice((1, 2.5, 10)), cy + r, cz)
+        elif kind == 2:
+            # segment along the x axis through the center, it ends before, inside or after the sphere
+            start = cx - r - rng.uniform(0, 5)
+            line = (start, cy, cz, start + rng.uniform(0.1, 3) * r, cy, cz)
+        elif kind == 3:
+            # ray through the center pointing away from the sphere, roots are negative
+            start = cx + r + rng.uniform(0.1, 5)
+            line = (start, cy, cz, start + rng.uniform(0.1, 5), cy + rng.uniform(-0.1, 0.1), cz)
+        else:
+            point = (coordinate(), coordinate(), coordinate())
+            line = point + point
+
+        records.append((line, (cx, cy, cz, r)))
+
+    return records
+
+def scalar_texts(records:list, solver:str, eps:float, mode:str) -> list:
+
+    return [find_sphere_line_collision(Line(Point(*line[:3]), Point(*line[3:])), Sphere(Point(*sphere[:3]), sphere[3]),
+                                       solver, eps, mode)
+            for line, sphere in records]
+
+def scalar_points(text:str) -> list:
+    """ Function returns coordinates of the points in the text of find_sphere_line_collision """
+
+    if text in ('No collision detected', 'Collision detected'):
+        return []
+    return [float(value) for value in text.replace('\n', ',').split(',') if value.strip()]
+
+def test_texts_equal_scalar():
+    """ The loops over the columns are the same to the last bit as the scalar functions """
+
+    records = generate_records()
+    lines = [line for line, _ in records]
+    spheres = [sphere for _, sphere in records]
+
+    use_numpy = batch.USE_NUMPY
+    batch.USE_NUMPY = False
+    try:
+        for solver in QUADRATIC_SOLVERS:
+            for eps in SOLVER_EPS[solver]:
+                for mode in QUERY_MODES:
+                    expected = scalar_texts(records, solver, eps, mode)
+                    assert find_sphere_line_collision_texts(lines, spheres, solver, eps, mode) == expected, (solver, eps, mode)
+
+                    hits, first, second = find_sphere_line_collision_batch(lines, spheres, solver, eps, mode)
+                    assert format_collision_batch(hits, first, second, mode) == expected, (solver, eps, mode)
+    finally:
+        batch.USE_NUMPY = use_numpy
+
+def test_numpy_close_to_scalar():
+    """ The numpy path finds the same points as the scalar functions up to rounding
+
+        with eps equal to zero tangent lines are skipped, rounding decides if they have one point or two
+    """
+
+    if batch.numpy is None:
+        return
+
+    records = generate_records()
+    lines = [line for line, _ in records]
+    spheres = [sphere for _, sphere in records]
+
+    for solver in QUADRATIC_SOLVERS:
+        for eps in SOLVER_EPS[solver]:
+            for mode in QUERY_MODES:
+                expected = scalar_texts(records, solver, eps, mode)
+                hits, first, second = batch.solve_columns_numpy(batch.line_columns(lines), batch.sphere_columns(spheres),
+                                                                solver, eps, mode)
+                assert isinstance(hits, bytearray) and len(first) == len(second) == 3 * len(records)
+
+                for i, text in enumerate(expected):
+                    if i % 5 == 1 and eps == 0:
+                        continue
+                    assert bool(hits[i]) == (text != 'No collision detected'), (solver, eps, mode, i)
+                    if mode == 'any_hit':
+                        continue
+                    points = scalar_points(text)
+                    assert hits[i] == len(points) // 3, (solver, eps, mode, i)
+                    values = first[3 * i:3 * i + 3].tolist() + second[3 * i:3 * i + 3].tolist()
+                    assert all(math.isclose(value, point, rel_tol=1e-9, abs_tol=1e-9)
+                               for value, point in zip(values, points)), (solver, eps, mode, i)
+                    assert all(math.isnan(value) for value in values[len(points):]), (solver, eps, mode, i)
+
+def test_record_kinds_are_covered():
+
+    records = generate_records()
+    all_texts = scalar_texts(records, 'classic', 0.0, 'all')
+    ray_texts = scalar_texts(records, 'classic', 0.0, 'ray')
+    segment_texts = scalar_texts(records, 'classic', 0.0, 'segment_only')
+
+    points = [text.count('\n') // 2 for text in all_texts]
+    assert 0 in points and 1 in points and 2 in points
+    assert any(all_text != segment_text for all_text, segment_text in zip(all_texts, segment_texts))
+    assert any(all_text != ray_text for all_text, ray_text in zip(all_texts, ray_texts))
+
+def test_equal_points_have_no_collision():
+
+    line = Line(Point(1, 2, 3), Point(1, 2, 3))
+    sphere = Sphere(Point(1, 2, 3), 5)
+
+    for solver in QUADRATIC_SOLVERS:
+        assert find_sphere_line_collision(line, sphere, solver) == 'No collision detected'
+        assert find_sphere_line_collision_texts([(1, 2, 3, 1, 2, 3)], [(1, 2, 3, 5)], solver) == ['No collision detected']
+
+
+if __name__ == '__main__':
+
+    test_texts_equal_scalar()
+    test_numpy_close_to_scalar()
+    test_record_kinds_are_covered()
+    test_equal_points_have_no_collision()
+    print('OK')
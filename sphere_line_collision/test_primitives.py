@@ -0,0 +1,94 @@
+""" Checks of the primitive kernels on simple cases with known collision points.
+
+    Run 'python -m pytest test_primitives.py' or 'python test_primitives.py' in this folder.
+"""
+
+import math
+
+from primitives import find_primitive_collision_batch, find_primitive_collisions
+
+SPHERE = (0, 0, 0, 1)
+PLANE = (0, 0, 0.5, 0, 0, 1)
+BOX = (-1, -2, -3, 1, 2, 3)
+CAPSULE = (0, 0, 0, 0, 0, 4, 1)
+
+# (kind, line, shape, solver, eps, mode, points)
+CASES = (
+    ('sphere', (-5, 0, 0, 5, 0, 0), SPHERE, 'classic', 0.0, 'all', [(-1, 0, 0), (1, 0, 0)]),
+    ('sphere', (-5, 1, 0, 5, 1, 0), SPHERE, 'classic', 0.0, 'all', [(0, 1, 0)]),
+    ('sphere', (-5, 1, 0, 5, 1, 0), SPHERE, 'stable', 1e-9, 'all', [(0, 1, 0)]),
+    ('sphere', (-5, 2, 0, 5, 2, 0), SPHERE, 'classic', 0.0, 'all', []),
+    ('sphere', (-5, 0, 0, -4, 0, 0), SPHERE, 'classic', 0.0, 'segment_only', []),
+
+    ('plane', (0, 0, -1, 0, 0, 1), PLANE, 'classic', 0.0, 'all', [(0, 0, 0.5)]),
+    ('plane', (0, 0, -1, 0, 0, 0), PLANE, 'classic', 0.0, 'all', [(0, 0, 0.5)]),
+    ('plane', (0, 0, -1, 0, 0, 0), PLANE, 'classic', 0.0, 'segment_only', []),
+    # lines parallel to the plane, the second one lies in it
+    ('plane', (0, 0, 1, 1, 0, 1), PLANE, 'classic', 0.0, 'all', []),
+    ('plane', (0, 0, 0.5, 1, 2, 0.5), PLANE, 'classic', 0.0, 'all', []),
+
+    ('box', (-5, 0, 0, 5, 0, 0), BOX, 'classic', 0.0, 'all', [(-1, 0, 0), (1, 0, 0)]),
+    ('box', (0, -5, 1, 0, 5, 1), BOX, 'classic', 0.0, 'first_hit', [(0, -2, 1)]),
+    # touching the edge of the box at (1, 2, 0)
+    ('box', (0, 3, 0, 2, 1, 0), BOX, 'classic', 0.0, 'all', [(1, 2, 0)]),
+    ('box', (-5, 5, 0, 5, 5, 0), BOX, 'classic', 0.0, 'all', []),
+
+    # the cylinder, the end cap at a, the end cap at b and the axis through both caps
+    ('capsule', (-5, 0, 2, 5, 0, 2), CAPSULE, 'classic', 0.0, 'all', [(-1, 0, 2), (1, 0, 2)]),
+    ('capsule', (-5, 0, -0.5, 5, 0, -0.5), CAPSULE, 'classic', 0.0, 'all',
+     [(-0.75 ** 0.5, 0, -0.5), (0.75 ** 0.5, 0, -0.5)]),
+    ('capsule', (-5, 0, 4.5, 5, 0, 4.5), CAPSULE, 'classic', 0.0, 'all',
+     [(-0.75 ** 0.5, 0, 4.5), (0.75 ** 0.5, 0, 4.5)]),
+    ('capsule', (0, 0, -5, 0, 0, 10), CAPSULE, 'classic', 0.0, 'all', [(0, 0, -1), (0, 0, 5)]),
+    ('capsule', (0, 0, -5, 0, 0, 10), CAPSULE, 'classic', 0.0, 'ray', [(0, 0, -1), (0, 0, 5)]),
+    # tangent to the cylinder and the near miss which is tangent within eps of the stable solver
+    ('capsule', (-5, 1, 2, 5, 1, 2), CAPSULE, 'classic', 0.0, 'all', [(0, 1, 2)]),
+    ('capsule', (-5, 1 + 1e-12, 2, 5, 1 + 1e-12, 2), CAPSULE, 'classic', 0.0, 'all', []),
+    ('capsule', (-5, 1 + 1e-12, 2, 5, 1 + 1e-12, 2), CAPSULE, 'stable', 1e-9, 'all', [(0, 1, 2)]),
+    ('capsule', (-5, 0, 0, 5, 0, 0), (0, 0, 0, 0, 0, 0, 1), 'classic', 0.0, 'all', [(-1, 0, 0), (1, 0, 0)]),
+)
+
+EQUAL_POINTS = (0, 0, 0, 0, 0, 0)
+SHAPES = {'sphere': SPHERE, 'plane': PLANE, 'box': BOX, 'capsule': CAPSULE}
+
+
+def get_points(hits, first, second, i:int) -> list:
+
+    return [tuple(points[3 * i:3 * i + 3]) for points in (first, second)][:hits[i]]
+
+def assert_points(points:list, expected:list, case):
+
+    assert len(points) == len(expected), (case, points)
+    for point, expected_point in zip(points, expected):
+        assert all(math.isclose(value, expected_value, abs_tol=1e-6)
+                   for value, expected_value in zip(point, expected_point)), (case, points)
+
+def test_reference_cases():
+
+    for case in CASES:
+        kind, line, shape, solver, eps, mode, expected = case
+        hits, first, second = find_primitive_collision_batch(kind, [line], [shape], solver, eps, mode)
+        assert_points(get_points(hits, first, second, 0), expected, case)
+
+def test_equal_points_have_no_collision():
+
+    for kind, shape in SHAPES.items():
+        hits, _, _ = find_primitive_collision_batch(kind, [EQUAL_POINTS], [shape])
+        assert hits[0] == 0, kind
+
+def test_mixed_scene_equals_single_kinds():
+    """ Cases of every kind are repeated, so their groups are large enough for the numpy path of batch.py """
+
+    cases = [case for case in CASES if case[3:6] == ('classic', 0.0, 'all')] * 11
+    hits, first, second = find_primitive_collisions([case[1] for case in cases], [(case[0], case[2]) for case in cases])
+
+    for i, case in enumerate(cases):
+        assert_points(get_points(hits, first, second, i), case[6], case)
+
+
+if __name__ == '__main__':
+
+    test_reference_cases()
+    test_equal_points_have_no_collision()
+    test_mixed_scene_equals_single_kinds()
+    print('OK')
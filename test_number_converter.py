@@ -0,0 +1,77 @@
+""" Checks of number_converter.py against the first version of i_to_base_all.
+
+    Run 'python -m pytest test_number_converter.py' or 'python test_number_converter.py'.
+"""
+
+import random
+
+from number_converter import convert_chunk, convert_many, i_to_base, i_to_base_all
+
+# ascii digits and letters, signs, non-ascii decimal digits and letters, and characters
+# whose upper case has several characters ('ß' is 'SS', 'ﬀ' is 'FF')
+ALPHABET = '0123456789abcfzAFZ-+. ' + '٣۷१ıéİǅß' + 'ﬀ'
+BASES = ('2', '10', '16', '36')
+
+
+def i_to_base_all_baseline(nb:str, base_src:str, base_dst:str):
+    """ The first version of i_to_base_all, only its messages and results are kept """
+
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    base_src = int(base_src)
+
+    if nb.isdigit():
+        for digit in nb:
+            if int(digit) >= base_src:
+                return 'Wrong base number system'
+    else:
+        for char in nb:
+            if not char.isdigit() and char.upper() not in letters:
+                if char == '-' and nb.index(char) == 0:
+                    return 'The value to convert must be non-negative'
+                return 'Wrong value to convert. The value to convert must be non-negative number'
+        for char in nb:
+            char = int(char) if char.isdigit() else letters.index(char.upper()) + 10
+            if char >= base_src:
+                return 'Wrong base number system'
+
+    in_decimal = 0
+    for digit in nb:
+        in_decimal = in_decimal * base_src + (int(digit) if digit.isdigit() else letters.index(digit.upper()) + 10)
+    return i_to_base(in_decimal, base_dst)
+
+def generate_values(number:int=30000, seed:int=0) -> list:
+
+    rng = random.Random(seed)
+    return [''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 5))) for _ in range(number)]
+
+def test_i_to_base_all_equals_baseline():
+
+    for i, value in enumerate(generate_values()):
+        base_src = BASES[i % len(BASES)]
+        base_dst = BASES[i // len(BASES) % len(BASES)]
+        assert i_to_base_all(value, base_src, base_dst) == i_to_base_all_baseline(value, base_src, base_dst), value
+
+def test_multi_character_upper_case_is_wrong_value():
+
+    wrong_value = 'Wrong value to convert. The value to convert must be non-negative number'
+    assert i_to_base_all('ß', '36', '10') == wrong_value
+    assert i_to_base_all('ﬀ', '16', '10') == wrong_value
+    assert convert_many(['ß', 'ﬀ', '٣'], 36, 10) == [wrong_value, wrong_value, '3']
+    assert convert_chunk('ß\nﬀ\n٣\n'.encode(), 36, 10) == f'{wrong_value}\n{wrong_value}\n3\n'.encode()
+
+def test_convert_many_and_chunk_equal_baseline():
+
+    values = [value for value in generate_values(seed=1) if value.strip() == value and value]
+    for base_src in BASES:
+        expected = [i_to_base_all_baseline(value, base_src, '7') for value in values]
+        assert convert_many(values, int(base_src), 7) == expected
+        data = ''.join(f'{value}\n' for value in values).encode()
+        assert convert_chunk(data, int(base_src), 7) == ''.join(f'{result}\n' for result in expected).encode()
+
+
+if __name__ == '__main__':
+
+    test_i_to_base_all_equals_baseline()
+    test_multi_character_upper_case_is_wrong_value()
+    test_convert_many_and_chunk_equal_baseline()
+    print('OK')
@@ -1,11 +1,38 @@
+""" To-do list of tasks with deadlines stored in todo.db
+
+    Run 'to_do_list.py' for the menu or 'to_do_list.py command' to run one command without it:
+
+    today, week, all, missed        - print the tasks
+    add TASK [--deadline YYYY-MM-DD] - add the task and print its id
+    delete --id ID                  - delete the task
+    import FILE, export FILE        - load or dump tasks as csv or json lines
+
+    The functions can be used from other modules: find_day_tasks, find_week_tasks, iter_tasks,
+    iter_missed_tasks, add_task, delete_task_by_id, import_tasks, export_tasks. The database is opened
+    by the first function which needs it, use_database switches to another one.
+"""
+
+import argparse
+import csv
+import functools
+import json
+import os
+import sys
+import time
 from datetime import datetime, timedelta
 
 from sqlalchemy import Column, Integer, String, Date
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, delete, select, tuple_
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+DATABASE_URL = "sqlite:///todo.db?check_same_thread=False"
+
+# rows inserted in one transaction by import and fetched at once by export
+BATCH_SIZE = 10000
+FILE_FORMATS = ("csv", "jsonl")
+# rows fetched by one query of the paginated listing
+PAGE_SIZE = 1000
 
-engine = create_engine("sqlite:///todo.db?check_same_thread=False")
 Base = declarative_base()
 
 
@@ -13,12 +40,48 @@ class Table(Base):
     __tablename__ = "task"
     id = Column(Integer, primary_key=True)
     task = Column(String)
-    deadline = Column(Date, default=datetime.today())
+    deadline = Column(Date, default=datetime.today(), index=True)
+
+
+def create_tables(bind):
+    Base.metadata.create_all(bind)
+    # create_all skips indexes of tables which already exist, so the index on deadline
+    # is added to databases created before it
+    for index in Table.__table__.indexes:
+        index.create(bind, checkfirst=True)
+
+
+# the engine and the session are created by the first command which needs them
+engine = None
+session = None
+
+
+def get_engine():
+    global engine
+    if engine is None:
+        engine = create_engine(DATABASE_URL)
+        create_tables(engine)
+    return engine
 
 
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
-session = Session()
+def get_session():
+    global session
+    if session is None:
+        session = sessionmaker(bind=get_engine())()
+    return session
+
+
+def use_database(database_url):
+    """ Function switches to another database, the current session and engine are closed """
+
+    global DATABASE_URL, engine, session
+    if session is not None:
+        session.close()
+    if engine is not None:
+        engine.dispose()
+    DATABASE_URL = database_url
+    engine = None
+    session = None
 
 
 def ask_user():
@@ -33,79 +96,252 @@ def ask_user():
 """)
 
 
+@functools.lru_cache(maxsize=1024)
+def format_deadline(deadline):
+    return f"{deadline.strftime('%d')} {deadline.strftime('%b')}"
+
+
 def print_tasks(tasks, task_description_format="day", message_if_empty="Nothing to do!"):
-    if tasks:
-        task_position = 1
-        if task_description_format == "day":
-            for task in tasks:
-                print(f"{task_position}. {task.task}")
-                task_position += 1
-        elif task_description_format == "all":
-            for task in tasks:
-                print(f"{task_position}. {task.task}. {task.deadline.strftime('%d')} {task.deadline.strftime('%b')}")
-                task_position += 1
-    else:
+    """ Function prints tasks while they are iterated, return the number of printed tasks """
+
+    task_position = 0
+    if task_description_format == "day":
+        for task_position, task in enumerate(tasks, 1):
+            print(f"{task_position}. {task.task}")
+    elif task_description_format == "all":
+        for task_position, task in enumerate(tasks, 1):
+            print(f"{task_position}. {task.task}. {format_deadline(task.deadline)}")
+    if not task_position:
         print(message_if_empty)
+    return task_position
 
 
-def get_day_tasks(day_number=None):
+def iter_tasks(condition=None, page_size=PAGE_SIZE):
+    """ Generator of (id, task, deadline) rows ordered by deadline and id
+
+        rows are fetched by pages of page_size, every page starts after the last row of the previous one
+        (keyset pagination), so pages are found by the index on deadline instead of skipping rows by OFFSET
+    """
+
+    query = select(Table.id, Table.task, Table.deadline).order_by(Table.deadline, Table.id).limit(page_size)
+    if condition is not None:
+        query = query.where(condition)
+
+    page_query = query
+    while True:
+        rows = get_session().execute(page_query).all()
+        yield from rows
+        if len(rows) < page_size:
+            break
+        last_id, _, last_deadline = rows[-1]
+        page_query = query.where(tuple_(Table.deadline, Table.id) > (last_deadline, last_id))
+
+
+def print_day_tasks(tasks, day_number):
     week_days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+    current_day = datetime.today() + timedelta(day_number)
+    day_name = week_days[current_day.weekday()]
+    print()
+    print(f"{day_name} {current_day.strftime('%d')} {current_day.strftime('%b')}:")
+    print_tasks(tasks)
+
+
+def find_day_tasks(day_number=0):
+    """ Function returns tasks of the day day_number days after today """
+
+    deadline = datetime.today().date() + timedelta(day_number)
+    return get_session().query(Table).filter(Table.deadline == deadline).all()
+
+
+def find_week_tasks(days_in_week=7):
+    """ Function returns lists of tasks of today and of the following days """
+
+    today = datetime.today().date()
+    # one range query over the index on deadline, the rows are grouped by day here
+    tasks = get_session().query(Table).filter(Table.deadline >= today, Table.deadline < today + timedelta(days_in_week))
+    tasks_by_day = [[] for _ in range(days_in_week)]
+    for task in tasks.order_by(Table.deadline, Table.id):
+        tasks_by_day[(task.deadline - today).days].append(task)
+    return tasks_by_day
+
+
+def iter_missed_tasks():
+    return iter_tasks(Table.deadline < datetime.today().date())
+
+
+def get_day_tasks(day_number=None):
     if day_number is None:
-        tasks = session.query(Table).filter(Table.deadline == datetime.today().date()).all()
+        tasks = find_day_tasks()
         print()
         print(f"Today {datetime.today().strftime('%d')} {datetime.today().strftime('%b')}:")
+        print_tasks(tasks)
     else:
-        tasks = session.query(Table).filter(Table.deadline == datetime.today().date() + timedelta(day_number)).all()
-        current_day = datetime.today() + timedelta(day_number)
-        day_name = week_days[current_day.weekday()]
-        print()
-        print(f"{day_name} {current_day.strftime('%d')} {current_day.strftime('%b')}:")
-    print_tasks(tasks)
+        print_day_tasks(find_day_tasks(day_number), day_number)
 
 
 def get_week_tasks():
-    days_in_week = 7
-    for day in range(days_in_week):
-        get_day_tasks(day)
+    for day, tasks in enumerate(find_week_tasks()):
+        print_day_tasks(tasks, day)
 
 
 def get_all_tasks():
     print()
     print("All tasks:")
-    tasks = session.query(Table).order_by(Table.deadline).all()
-    print_tasks(tasks, "all")
+    print_tasks(iter_tasks(), "all")
 
 
 def get_missed_tasks():
     print()
     print("Missed tasks:")
-    tasks = session.query(Table).filter(Table.deadline < datetime.today().date()).order_by(Table.deadline).all()
-    print_tasks(tasks, "all", "There's no missed tasks")
+    print_tasks(iter_missed_tasks(), "all", "There's no missed tasks")
 
 
 def delete_task():
     print()
     print("Choose the number of the task you want to delete:")
-    tasks = session.query(Table).order_by(Table.deadline).all()
-    print_tasks(tasks, "all", "Nothing to delete")
-    if tasks:
-        delete = int(input())
-        row_to_delete = tasks[delete - 1]
-        session.delete(row_to_delete)
-        session.commit()
+    if print_tasks(iter_tasks(), "all", "Nothing to delete"):
+        task_position = int(input())
+        # the position is mapped to the primary key, the listing is not kept in memory
+        task_id = None
+        if task_position > 0:
+            query = select(Table.id).order_by(Table.deadline, Table.id).offset(task_position - 1).limit(1)
+            task_id = get_session().execute(query).scalar()
+        if task_id is None:
+            print("Wrong task number")
+            return
+        delete_task_by_id(task_id)
         print("The task has been deleted!")
 
 
+def delete_task_by_id(task_id):
+    """ Function deletes the task by its primary key, return True if the task existed """
+
+    session = get_session()
+    deleted = session.execute(delete(Table).where(Table.id == task_id)).rowcount
+    session.commit()
+    return bool(deleted)
+
+
+def parse_deadline(deadline):
+    return datetime.strptime(deadline, "%Y-%m-%d").date()
+
+
+def add_task(task_description, deadline=None):
+    """ Function adds the task, the deadline is a date or None for today, return the id of the task """
+
+    session = get_session()
+    new_task = Table(task=task_description, deadline=deadline or datetime.today().date())
+    session.add(new_task)
+    session.commit()
+    return new_task.id
+
+
 def add_new_task():
     print()
     task_description = input("Enter task\n")
     deadline = input("Enter deadline\n")
-    new_task = Table(task=task_description, deadline=datetime.strptime(deadline, f"%Y-%m-%d"))
-    session.add(new_task)
-    session.commit()
+    add_task(task_description, parse_deadline(deadline))
     print("The task has been added!")
 
 
+def get_file_format(file_name, file_format=None):
+    if file_format is None:
+        extension = os.path.splitext(file_name)[1].lstrip(".").lower()
+        file_format = extension if extension in FILE_FORMATS else "csv"
+    return file_format
+
+
+def read_task_rows(file, file_format):
+    """ Generator of {"task", "deadline"} rows of the csv file with a header or of the json lines file """
+
+    if file_format == "csv":
+        records = csv.DictReader(file)
+    else:
+        records = (json.loads(line) for line in file if line.strip())
+
+    for line_number, record in enumerate(records, 1):
+        try:
+            deadline = parse_deadline(record["deadline"])
+            yield {"task": record["task"], "deadline": deadline}
+        except (KeyError, TypeError, ValueError) as error:
+            raise ValueError(f"Wrong task in record {line_number}: {error}") from None
+
+
+def print_progress(action, rows_number, start_time, end=""):
+    elapsed = time.perf_counter() - start_time
+    rate = rows_number / elapsed if elapsed else 0
+    print(f"\r{action} {rows_number} tasks, {rate:.0f} rows/sec", end=end, file=sys.stderr, flush=True)
+
+
+def import_tasks(file, file_format="csv", batch_size=BATCH_SIZE):
+    """ Function inserts tasks of the file by Core bulk inserts of batch_size rows in one transaction,
+        WAL journal and synchronous=NORMAL are used during the import, then the previous settings are restored
+
+        return the number of imported tasks
+    """
+
+    insert = Table.__table__.insert()
+    imported = 0
+    start_time = time.perf_counter()
+
+    with get_engine().connect() as connection:
+        journal_mode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+        synchronous = connection.exec_driver_sql("PRAGMA synchronous").scalar()
+        connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+        connection.exec_driver_sql("PRAGMA synchronous=NORMAL")
+        try:
+            batch = []
+            for row in read_task_rows(file, file_format):
+                batch.append(row)
+                if len(batch) == batch_size:
+                    connection.execute(insert, batch)
+                    connection.commit()
+                    imported += len(batch)
+                    batch = []
+                    print_progress("Imported", imported, start_time)
+            if batch:
+                connection.execute(insert, batch)
+                connection.commit()
+                imported += len(batch)
+        finally:
+            connection.rollback()
+            # the connection goes back to the pool, so later writes get the previous durability
+            connection.exec_driver_sql(f"PRAGMA journal_mode={journal_mode}")
+            connection.exec_driver_sql(f"PRAGMA synchronous={synchronous}")
+            print_progress("Imported", imported, start_time, "\n")
+
+    return imported
+
+
+def export_tasks(file, file_format="csv", batch_size=BATCH_SIZE):
+    """ Function writes all tasks ordered by deadline to the file, rows are fetched by batch_size
+
+        return the number of exported tasks
+    """
+
+    query = select(Table.task, Table.deadline).order_by(Table.deadline, Table.id)
+    exported = 0
+    start_time = time.perf_counter()
+
+    if file_format == "csv":
+        writer = csv.writer(file)
+        writer.writerow(("task", "deadline"))
+        write_rows = writer.writerows
+    else:
+        def write_rows(rows):
+            file.writelines(json.dumps({"task": task, "deadline": deadline}) + "\n" for task, deadline in rows)
+
+    with get_engine().connect() as connection:
+        result = connection.execution_options(yield_per=batch_size).execute(query)
+        for rows in result.partitions():
+            write_rows([(task, deadline.isoformat()) for task, deadline in rows])
+            exported += len(rows)
+            print_progress("Exported", exported, start_time)
+
+    print_progress("Exported", exported, start_time, "\n")
+    return exported
+
+
 def start_to_do_list():
     what_to_do = ask_user()
 
@@ -131,5 +367,80 @@ def start_to_do_list():
     print("Bye!")
 
 
-start_to_do_list()
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="To-do list, the menu is shown if no command is given")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("today", help="print today's tasks")
+    commands.add_parser("week", help="print tasks of the week")
+    commands.add_parser("all", help="print all tasks")
+    commands.add_parser("missed", help="print missed tasks")
+
+    add_parser = commands.add_parser("add", help="add the task and print its id")
+    add_parser.add_argument("task", help="description of the task")
+    add_parser.add_argument("--deadline", type=parse_deadline, help="deadline as YYYY-MM-DD, today by default")
+
+    delete_parser = commands.add_parser("delete", help="delete the task by its id")
+    delete_parser.add_argument("--id", type=int, required=True, dest="task_id", help="id of the task")
+
+    for command, action in (("import", "read tasks from"), ("export", "write tasks to")):
+        command_parser = commands.add_parser(command, help=f"{action} a csv or json lines file")
+        command_parser.add_argument("file_name", help=f"file to {action.split()[0]}, '-' for standard streams")
+        command_parser.add_argument("--format", choices=FILE_FORMATS, dest="file_format",
+                                    help="format of the file, by default it is taken from the file extension or csv")
+        command_parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                                    help="number of rows in one transaction or one fetch")
+
+    return parser.parse_args()
+
+
+def run_command(arguments):
+    if arguments.command == "today":
+        get_day_tasks()
+    elif arguments.command == "week":
+        get_week_tasks()
+    elif arguments.command == "all":
+        get_all_tasks()
+    elif arguments.command == "missed":
+        get_missed_tasks()
+    elif arguments.command == "add":
+        task_id = add_task(arguments.task, arguments.deadline)
+        print(f"The task has been added! Its id is {task_id}")
+    elif arguments.command == "delete":
+        if not delete_task_by_id(arguments.task_id):
+            raise ValueError(f"There is no task with id {arguments.task_id}")
+        print("The task has been deleted!")
+    else:
+        run_file_command(arguments)
+
+
+def run_file_command(arguments):
+    file_format = get_file_format(arguments.file_name, arguments.file_format)
+
+    if arguments.command == "import":
+        if arguments.file_name == "-":
+            import_tasks(sys.stdin, file_format, arguments.batch_size)
+        else:
+            with open(arguments.file_name, newline="", encoding="utf-8") as file:
+                import_tasks(file, file_format, arguments.batch_size)
+    elif arguments.command == "export":
+        if arguments.file_name == "-":
+            export_tasks(sys.stdout, file_format, arguments.batch_size)
+        else:
+            with open(arguments.file_name, "w", newline="", encoding="utf-8") as file:
+                export_tasks(file, file_format, arguments.batch_size)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        try:
+            run_command(parse_arguments())
+        except ValueError as error:
+            sys.exit(str(error))
+        except BrokenPipeError:
+            # the reader of the output has exited, like head, the rest of the output is dropped
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            sys.exit(1)
+    else:
+        start_to_do_list()
 
@@ -0,0 +1,182 @@
+""" Benchmarks of to_do_list.py
+
+    To run benchmarks enter 'to_do_list_benchmark.py benchmark_name' in console.
+    Databases of tasks are seeded in a temporary directory.
+
+    Available benchmarks:
+
+    week   - compares the weekly view of seven day queries without the index on deadline,
+             seven day queries with the index and one range query with the index
+    list   - compares the time and the peak memory of listing all tasks loaded by one query
+             with the paginated listing which prints rows as they are fetched
+    import - compares rows/sec of adding tasks with a commit for every task with import_tasks
+             of a csv file in batches of several sizes
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+
+import to_do_list
+from to_do_list import Table, create_tables, import_tasks
+
+
+def get_week_tasks_by_days():
+    """ The previous weekly view, one query for every day """
+
+    for day in range(7):
+        to_do_list.get_day_tasks(day)
+
+
+def get_all_tasks_loaded():
+    """ The previous listing of all tasks, the tasks are loaded as ORM objects before printing """
+
+    tasks = to_do_list.get_session().query(Table).order_by(Table.deadline).all()
+    if tasks:
+        for task_position, task in enumerate(tasks, 1):
+            print(f"{task_position}. {task.task}. {task.deadline.strftime('%d')} {task.deadline.strftime('%b')}")
+
+
+def seed_database(path, tasks_number, with_index):
+    """ Function creates the database of tasks_number tasks with deadlines within a year from today """
+
+    engine = create_engine(f"sqlite:///{path}")
+    create_tables(engine)
+    if not with_index:
+        for index in Table.__table__.indexes:
+            index.drop(engine)
+
+    random.seed(0)
+    today = datetime.today().date()
+    rows = [{"task": f"Task {i}", "deadline": today + timedelta(random.randint(-365, 365))}
+            for i in range(tasks_number)]
+    with engine.begin() as connection:
+        connection.execute(Table.__table__.insert(), rows)
+    return engine
+
+
+def measure(run, repeat):
+    """ Function returns the best time of one run in seconds, the output of run is discarded """
+
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        return min(timeit.repeat(run, number=1, repeat=repeat))
+
+
+def benchmark_week(tasks_numbers, repeat):
+    print(f"{'tasks':>8} {'no index':>12} {'index':>12} {'range query':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for tasks_number in tasks_numbers:
+            timings = []
+            for with_index, run in ((False, get_week_tasks_by_days), (True, get_week_tasks_by_days),
+                                    (True, to_do_list.get_week_tasks)):
+                path = os.path.join(directory, f"todo_{tasks_number}_{with_index}.db")
+                if not os.path.exists(path):
+                    seed_database(path, tasks_number, with_index).dispose()
+                to_do_list.use_database(f"sqlite:///{path}")
+                timings.append(measure(run, repeat))
+
+            print(f"{tasks_number:>8} " + " ".join(f"{timing * 1000:>9.2f} ms" for timing in timings))
+
+
+def measure_memory(run):
+    """ Function returns the peak memory of allocations made by run in bytes """
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return peak
+
+
+def benchmark_list(tasks_numbers, repeat):
+    print(f"{'tasks':>8} {'loaded':>12} {'paginated':>12} {'loaded peak':>14} {'paginated peak':>14}")
+    with tempfile.TemporaryDirectory() as directory:
+        for tasks_number in tasks_numbers:
+            path = os.path.join(directory, f"todo_{tasks_number}.db")
+            seed_database(path, tasks_number, True).dispose()
+            to_do_list.use_database(f"sqlite:///{path}")
+
+            variants = (get_all_tasks_loaded, to_do_list.get_all_tasks)
+            timings = [measure(run, repeat) for run in variants]
+            # a new session for every run, objects of the identity map are not kept between runs
+            peaks = []
+            for run in variants:
+                to_do_list.get_session().close()
+                peaks.append(measure_memory(run))
+
+            print(f"{tasks_number:>8} " + " ".join(f"{timing * 1000:>9.2f} ms" for timing in timings) +
+                  " " + " ".join(f"{peak / 2 ** 20:>11.2f} MB" for peak in peaks))
+
+
+def generate_csv(tasks_number):
+    random.seed(0)
+    today = datetime.today().date()
+    return "task,deadline\n" + "".join(f"Task {i},{today + timedelta(random.randint(-365, 365))}\n"
+                                       for i in range(tasks_number))
+
+
+def benchmark_import(tasks_number, commits_number, batch_sizes, repeat):
+    data = generate_csv(tasks_number)
+
+    with tempfile.TemporaryDirectory() as directory:
+        def new_database():
+            path = os.path.join(directory, "todo.db")
+            # the previous engine is closed before its database is removed
+            to_do_list.use_database(f"sqlite:///{path}")
+            if os.path.exists(path):
+                os.remove(path)
+
+        def add_with_commits():
+            # add_new_task commits every task, it is measured on a part of the tasks
+            new_database()
+            session = to_do_list.get_session()
+            for row in to_do_list.read_task_rows(io.StringIO(data), "csv"):
+                if row["task"] == f"Task {commits_number}":
+                    break
+                session.add(Table(**row))
+                session.commit()
+
+        elapsed = measure(add_with_commits, 1)
+        print(f"{'commit every task':>20}: {commits_number / elapsed:>10.0f} rows/sec")
+
+        for batch_size in batch_sizes:
+            def run_import():
+                new_database()
+                import_tasks(io.StringIO(data), "csv", batch_size)
+
+            elapsed = measure(run_import, repeat)
+            print(f"{f'batches of {batch_size}':>20}: {tasks_number / elapsed:>10.0f} rows/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of to_do_list.py")
+    parser.add_argument("benchmark", choices=("week", "list", "import"))
+    parser.add_argument("--tasks", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="numbers of tasks in the seeded databases of the week and list benchmarks")
+    parser.add_argument("--import-tasks", type=int, default=200000, help="number of tasks in the import benchmark")
+    parser.add_argument("--commits", type=int, default=1000,
+                        help="number of tasks added with a commit for every task in the import benchmark")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="batch sizes of the import benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="how many times every view is measured")
+    arguments = parser.parse_args()
+
+    if arguments.benchmark == "week":
+        benchmark_week(arguments.tasks, arguments.repeat)
+    elif arguments.benchmark == "list":
+        benchmark_list(arguments.tasks, arguments.repeat)
+    elif arguments.benchmark == "import":
+        benchmark_import(arguments.import_tasks, arguments.commits, arguments.batch_sizes, arguments.repeat)
+
+
+if __name__ == "__main__":
+    main()